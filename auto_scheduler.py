@@ -1,46 +1,99 @@
 import schedule
-import time
 import asyncio
+import contextlib
 from pathlib import Path
 from datetime import datetime
 import os
-from scripts.ai_generator import AIScriptGenerator
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from scripts.model_server import ModelClient
 from scripts.text_to_speech import text_to_speech
 from scripts.create_video import create_video
+from scripts.prepare_audio import prepare_audio
 from scripts.upload_youtube import upload_to_youtube
 from scripts.approval_system import ApprovalSystem
+from scripts.generate_script import load_quote_corpus
+from scripts.utils import parse_weights
 
 class AutomatedYouTubeShorts:
-    def __init__(self, telegram_token, test_mode=False):
+    def __init__(self, telegram_token, test_mode=False, model_socket=None,
+                 ai_generator=None, approval_system=None, output_dir='.',
+                 topics=None, backgrounds=None, render_executor=None, generator_options=None,
+                 generator_executor=None):
         self.project_root = Path(__file__).parent.absolute()
-        self.ai_generator = AIScriptGenerator()
-        self.approval_system = ApprovalSystem(telegram_token)
+        self.output_dir = Path(output_dir)
+        self.topics = topics
+        self.backgrounds = backgrounds or [str(self.project_root / "assets" / "background.jpg")]
+        # None uses the event loop's default executor
+        self.render_executor = render_executor
+        self.generator_executor = generator_executor
+        if ai_generator is not None:
+            self.ai_generator = ai_generator
+        elif model_socket:
+            # Share the model loaded by scripts.model_server, falls back to in-process
+            self.ai_generator = ModelClient(model_socket, generator_options=generator_options)
+        else:
+            from scripts.ai_generator import AIScriptGenerator
+            self.ai_generator = AIScriptGenerator(**(generator_options or {}))
+            if generator_executor is None:
+                # The in-process model is not thread-safe, so calls run one at a time
+                self.generator_executor = ThreadPoolExecutor(max_workers=1)
+        self.approval_system = approval_system or ApprovalSystem(telegram_token)
         self.test_mode = test_mode
+        self.tasks = set()  # Scheduled runs in flight
+        # Optional asyncio.Semaphore limiting this pipeline's use of shared stages
+        self.shared_slots = None
+
+        # Pipeline stages, replaceable with local stand-ins (see scripts/load_test.py)
+        self.text_to_speech = text_to_speech
+        self.prepare_audio = prepare_audio
+        self.create_video = create_video
+        self.upload_to_youtube = upload_to_youtube
         self.ensure_directories()
 
     def ensure_directories(self):
         """Ensure all required directories exist"""
-        os.makedirs('output', exist_ok=True)
+        os.makedirs(self.output_dir / 'output', exist_ok=True)
         os.makedirs('assets', exist_ok=True)
-        os.makedirs('approved', exist_ok=True)
-        os.makedirs('rejected', exist_ok=True)
+        os.makedirs(self.output_dir / 'approved', exist_ok=True)
+        os.makedirs(self.output_dir / 'rejected', exist_ok=True)
 
     def generate_paths(self):
         """Generate unique paths for files"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         return {
-            'audio': f"output/speech_{timestamp}.mp3",
-            'video': f"output/video_{timestamp}.mp4"
+            'audio': str(self.output_dir / 'output' / f"speech_{timestamp}.mp3"),
+            'prepared_audio': str(self.output_dir / 'output' / f"speech_{timestamp}.wav"),
+            'video': str(self.output_dir / 'output' / f"video_{timestamp}.mp4")
         }
 
+    @contextlib.asynccontextmanager
+    async def shared_stage(self):
+        """Hold one of this pipeline's slots on the shared generator/render pool"""
+        if self.shared_slots is None:
+            yield
+        else:
+            async with self.shared_slots:
+                yield
+
     async def create_and_approve_video(self):
-        """Create a video and get approval"""
+        """Create a video and get approval, returns whether it was approved or None on error"""
+        loop = asyncio.get_running_loop()
         try:
             # Generate paths
             paths = self.generate_paths()
 
             # Generate AI quote
-            quote, topic = self.ai_generator.generate_quote()
+            async with self.shared_stage():
+                if self.topics:
+                    quote, topic = await loop.run_in_executor(
+                        self.generator_executor, self.ai_generator.generate_quote, self.topics
+                    )
+                else:
+                    quote, topic = await loop.run_in_executor(
+                        self.generator_executor, self.ai_generator.generate_quote
+                    )
             print(f"\nGenerated Quote ({topic}): {quote}")
 
             # Create title and description
@@ -53,12 +106,24 @@ class AutomatedYouTubeShorts:
 
             # Generate speech
             print("Converting to speech...")
-            text_to_speech(quote, paths['audio'])
+            # Blocking stages run in a thread so Telegram callbacks keep flowing
+            await loop.run_in_executor(None, self.text_to_speech, quote, paths['audio'])
+
+            # Trim silence and normalize loudness, fewer seconds means fewer frames to encode
+            audio = await loop.run_in_executor(
+                None, self.prepare_audio, paths['audio'], paths['prepared_audio']
+            )
+            print(f"Trimmed {audio['seconds_saved']:.2f}s of silence "
+                  f"({audio['original_duration']:.2f}s -> {audio['duration']:.2f}s)")
 
             # Create video
             print("Creating video...")
-            background_image = str(self.project_root / "assets" / "background.jpg")
-            create_video(background_image, paths['audio'], paths['video'])
+            background_image = random.choice(self.backgrounds)
+            async with self.shared_stage():
+                await loop.run_in_executor(
+                    self.render_executor, self.create_video, background_image,
+                    paths['prepared_audio'], paths['video'], audio['duration']
+                )
 
             # Request approval
             print("Requesting approval...")
@@ -73,62 +138,289 @@ class AutomatedYouTubeShorts:
 
             if approved:
                 print("Video approved! Uploading to YouTube...")
-                upload_to_youtube(paths['video'], title, description)
+                await loop.run_in_executor(
+                    None, self.upload_to_youtube, paths['video'], title, description
+                )
                 # Move to approved folder
-                os.rename(paths['video'], f"approved/video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
+                os.rename(paths['video'], str(self.output_dir / 'approved' / os.path.basename(paths['video'])))
             else:
                 print("Video rejected.")
                 # Move to rejected folder
-                os.rename(paths['video'], f"rejected/video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
+                os.rename(paths['video'], str(self.output_dir / 'rejected' / os.path.basename(paths['video'])))
 
-            # Clean up audio file
+            # Clean up audio files
             os.remove(paths['audio'])
+            os.remove(paths['prepared_audio'])
+
+            return approved
 
         except Exception as e:
             print(f"Error in video creation process: {e}")
+            return None
+
+    async def start_polling(self):
+        """Receive approve/reject callbacks in this process"""
+        try:
+            await self.approval_system.start_polling()
+        except Exception as e:
+            print(f"Could not start Telegram polling, relying on auto-approval: {e}")
 
     async def run_test(self):
         """Run a single video creation test"""
         print("Running in test mode...")
-        await self.create_and_approve_video()
+        await self.start_polling()
+        try:
+            await self.create_and_approve_video()
+        finally:
+            await self.approval_system.stop_polling()
         print("Test completed!")
 
     def schedule_videos(self, times):
         """Schedule video creation at specific times"""
         for time_str in times:
-            schedule.every().day.at(time_str).do(
-                lambda: asyncio.run(self.create_and_approve_video())
-            )
+            # Runs inside run_async's event loop, next to the Telegram poller
+            schedule.every().day.at(time_str).do(self._start_video)
         print(f"Scheduled video creation for: {', '.join(times)}")
 
-    def run(self):
-        """Run the automated system"""
+    def _start_video(self):
+        # Keep a reference until the task is done, the loop only holds weak ones
+        task = asyncio.ensure_future(self.create_and_approve_video())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_async(self):
+        """Run scheduled jobs and Telegram polling in one event loop"""
         if self.test_mode:
             print("Starting test mode...")
-            asyncio.run(self.run_test())
+            await self.run_test()
             return
 
         print("Starting YouTube Shorts Automation System...")
         print("Press Ctrl+C to stop")
 
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+        await self.start_polling()
+        try:
+            while True:
+                schedule.run_pending()
+                await asyncio.sleep(60)
+        finally:
+            await self.approval_system.stop_polling()
+
+    def run(self):
+        """Run the automated system"""
+        asyncio.run(self.run_async())
+
+class MultiChannelScheduler:
+    """Serve several channels from one process.
+
+    The AI generator, the render thread pool and the background cache in
+    create_video are shared; an in-process generator is called from a single
+    thread since the model is not thread-safe. Each channel has its own
+    topics, backgrounds, schedule, approvers and output directory.
+
+    ``max_concurrent`` limits how many of a channel's videos are being
+    generated or rendered at once, so a busy channel cannot fill the shared
+    pools ahead of the others. Videos waiting for approval or uploading do
+    not count. It is capped at ``render_workers``.
+    """
+
+    def __init__(self, config_file, test_mode=False, model_socket=None, generator_options=None):
+        with open(config_file, 'r') as f:
+            self.config = json.load(f)
+        self.test_mode = test_mode
+        self.scheduler = schedule.Scheduler()
+
+        # The generator is shared, so its options are global; the command line wins
+        options = {
+            key: self.config[key]
+            for key in ('variation_candidates', 'variation_weights')
+            if key in self.config
+        }
+        options.update(generator_options or {})
+
+        model_socket = self.config.get('model_socket') or model_socket
+        if model_socket:
+            # The server batches concurrent requests, so calls are not serialized here
+            self.ai_generator = ModelClient(model_socket, generator_options=options)
+            self.generator_executor = None
+        else:
+            from scripts.ai_generator import AIScriptGenerator
+            self.ai_generator = AIScriptGenerator(**options)
+            self.generator_executor = ThreadPoolExecutor(max_workers=1)
+        self.render_workers = self.config.get('render_workers', 2)
+        self.render_executor = ThreadPoolExecutor(max_workers=self.render_workers)
+
+        self.channels = {}
+        self.tasks = set()  # Scheduled runs in flight
+        for channel in self.config['channels']:
+            self.add_channel(channel)
+
+    def add_channel(self, channel):
+        """Create the pipeline for one channel entry of the config file"""
+        name = channel['name']
+        if name in self.channels:
+            raise ValueError(f"Duplicate channel name: {name}")
+
+        output_dir = Path(channel.get('output_dir', Path('channels') / name))
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Each channel keeps its own approval config next to its videos
+        approval_config = output_dir / 'config.json'
+        self.write_approval_config(approval_config, channel)
+        approval_system = ApprovalSystem(
+            channel['telegram_token'],
+            base_url=channel.get('telegram_base_url'),
+            config_file=str(approval_config)
+        )
+
+        shorts = AutomatedYouTubeShorts(
+            channel['telegram_token'],
+            test_mode=self.test_mode,
+            ai_generator=self.ai_generator,
+            approval_system=approval_system,
+            output_dir=output_dir,
+            topics=channel.get('topics'),
+            backgrounds=channel.get('backgrounds'),
+            render_executor=self.render_executor,
+            generator_executor=self.generator_executor
+        )
+        self.channels[name] = {
+            'shorts': shorts,
+            'posting_times': channel.get('posting_times', ["10:00", "15:00", "20:00"]),
+            'quota': self.channel_quota(name, channel.get('max_concurrent', 1))
+        }
+
+    @staticmethod
+    def write_approval_config(approval_config, channel):
+        """Apply the channel's approval settings over its saved config.json.
+
+        Values given in the channels file win on every start; admins added
+        with /register are kept alongside the configured ones.
+        """
+        config = {
+            'admin_chat_ids': [],
+            'auto_approve_after': 30,
+            'digest_window': 5,
+            'messages_per_second': 25
+        }
+        if approval_config.exists():
+            with open(approval_config, 'r') as f:
+                config.update(json.load(f))
+
+        for key in ('auto_approve_after', 'digest_window', 'messages_per_second'):
+            if key in channel:
+                config[key] = channel[key]
+        for chat_id in channel.get('admin_chat_ids', []):
+            if chat_id not in config['admin_chat_ids']:
+                config['admin_chat_ids'].append(chat_id)
+
+        with open(approval_config, 'w') as f:
+            json.dump(config, f, indent=4)
+
+    def channel_quota(self, name, max_concurrent):
+        """A channel may not occupy more render workers than exist"""
+        if max_concurrent > self.render_workers:
+            print(f"[{name}] max_concurrent {max_concurrent} is above render_workers "
+                  f"{self.render_workers}, using {self.render_workers}")
+            return self.render_workers
+        return max(1, max_concurrent)
+
+    async def create_video_for(self, name):
+        """Run one pipeline for a channel, shared stages wait for a free slot in its quota"""
+        print(f"\n[{name}] Creating video...")
+        return await self.channels[name]['shorts'].create_and_approve_video()
+
+    def schedule_videos(self):
+        """Schedule every channel's posting times on the shared scheduler"""
+        for name, channel in self.channels.items():
+            for time_str in channel['posting_times']:
+                self.scheduler.every().day.at(time_str).do(self._start_video, name)
+            print(f"[{name}] Scheduled video creation for: {', '.join(channel['posting_times'])}")
+
+    def _start_video(self, name):
+        # Keep a reference until the task is done, the loop only holds weak ones
+        task = asyncio.ensure_future(self.create_video_for(name))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_async(self):
+        for name, channel in self.channels.items():
+            # Created here so the semaphore belongs to the running loop
+            channel['shorts'].shared_slots = asyncio.Semaphore(channel['quota'])
+            try:
+                # Receive approve/reject callbacks in this process
+                await channel['shorts'].approval_system.start_polling()
+            except Exception as e:
+                print(f"[{name}] Could not start Telegram polling, relying on auto-approval: {e}")
+
+        try:
+            if self.test_mode:
+                print("Running one video per channel in test mode...")
+                await asyncio.gather(*(self.create_video_for(name) for name in self.channels))
+                print("Test completed!")
+                return
+
+            self.schedule_videos()
+            print(f"Serving {len(self.channels)} channels. Press Ctrl+C to stop")
+            while True:
+                self.scheduler.run_pending()
+                await asyncio.sleep(30)
+        finally:
+            for channel in self.channels.values():
+                await channel['shorts'].approval_system.stop_polling()
+            self.render_executor.shutdown(wait=False)
+            if self.generator_executor is not None:
+                self.generator_executor.shutdown(wait=False)
+
+    def run(self):
+        """Run the multi-channel daemon"""
+        asyncio.run(self.run_async())
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='YouTube Shorts Automation')
-    parser.add_argument('--token', help='Telegram Bot Token', required=True)
+    parser.add_argument('--token', help='Telegram Bot Token')
+    parser.add_argument('--channels', help='JSON file describing several channels to serve from one process')
     parser.add_argument('--test', action='store_true', help='Run in test mode')
+    parser.add_argument('--model-socket', help='Use the shared model server on this Unix socket')
+    parser.add_argument('--quotes', help='JSONL/CSV quote corpus used for fallback quotes')
+    parser.add_argument('--quote-weights', help='Category mix for the corpus, e.g. motivation=3,success=1')
+    parser.add_argument('--variation-candidates', type=int,
+                        help='Variations sampled and reranked per quote, 1 disables reranking')
+    parser.add_argument('--variation-weights',
+                        help='Reranking weights, e.g. likelihood=1,length=0.5,punctuation=0.5,distance=1')
     args = parser.parse_args()
 
-    # Create automation system
-    auto_system = AutomatedYouTubeShorts(args.token, test_mode=args.test)
+    if args.quotes:
+        weights = parse_weights(args.quote_weights) if args.quote_weights else None
+        load_quote_corpus(args.quotes, weights)
+
+    generator_options = {}
+    if args.variation_candidates is not None:
+        generator_options['variation_candidates'] = args.variation_candidates
+    if args.variation_weights:
+        generator_options['variation_weights'] = parse_weights(args.variation_weights)
+
+    if args.channels:
+        # One daemon for every channel in the file
+        MultiChannelScheduler(
+            args.channels, test_mode=args.test, model_socket=args.model_socket,
+            generator_options=generator_options
+        ).run()
+    else:
+        if not args.token:
+            parser.error("--token is required unless --channels is given")
+
+        # Create automation system
+        auto_system = AutomatedYouTubeShorts(
+            args.token, test_mode=args.test, model_socket=args.model_socket,
+            generator_options=generator_options
+        )
 
-    if not args.test:
-        # Schedule videos at specific times (24-hour format)
-        posting_times = ["10:00", "15:00", "20:00"]  # Post 3 times a day
-        auto_system.schedule_videos(posting_times)
+        if not args.test:
+            # Schedule videos at specific times (24-hour format)
+            posting_times = ["10:00", "15:00", "20:00"]  # Post 3 times a day
+            auto_system.schedule_videos(posting_times)
 
-    # Run the system
-    auto_system.run()
\ No newline at end of file
+        # Run the system
+        auto_system.run()
@@ -5,6 +5,7 @@ from pathlib import Path
 from scripts.generate_script import get_random_quote, generate_title_and_description
 from scripts.text_to_speech import text_to_speech
 from scripts.create_video import create_video
+from scripts.prepare_audio import prepare_audio
 from scripts.upload_youtube import upload_to_youtube
 
 def ensure_directories():
@@ -17,6 +18,7 @@ def generate_output_paths():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return {
         'audio': f"output/speech_{timestamp}.mp3",
+        'prepared_audio': f"output/speech_{timestamp}.wav",
         'video': f"output/video_{timestamp}.mp4"
     }
 
@@ -40,13 +42,18 @@ def main():
         print("Converting text to speech...")
         text_to_speech(quote, paths['audio'])
 
+        # Trim silence and normalize loudness before rendering
+        audio = prepare_audio(paths['audio'], paths['prepared_audio'])
+        print(f"Trimmed {audio['seconds_saved']:.2f}s of silence "
+              f"({audio['original_duration']:.2f}s -> {audio['duration']:.2f}s)")
+
         # Step 3: Create video with audio and background image
         print("Creating video...")
         background_image = str(project_root / "assets" / "background.jpg")
         if not os.path.exists(background_image):
             raise FileNotFoundError(f"Background image not found: {background_image}")
 
-        create_video(background_image, paths['audio'], paths['video'])
+        create_video(background_image, paths['prepared_audio'], paths['video'], audio['duration'])
 
         # Step 4: Upload to YouTube (placeholder)
         print("Uploading to YouTube...")
@@ -1,10 +1,22 @@
 from transformers import pipeline, set_seed
+import numpy as np
+import torch
 import random
+import re
 import os
+import time
 from pathlib import Path
 
 class AIScriptGenerator:
-    def __init__(self):
+    # Relative weight of each reranking feature, all features span [0, 1]
+    DEFAULT_VARIATION_WEIGHTS = {
+        'likelihood': 1.0,   # Mean token log-probability, min-max scaled over the candidates
+        'length': 0.5,       # Closeness to the seed quote's length
+        'punctuation': 0.5,  # Clean sentence ending, no stray symbols
+        'distance': 1.0      # Lexical distance from the seed quote
+    }
+
+    def __init__(self, variation_candidates=8, variation_weights=None):
         # Set cache directory in the project folder
         cache_dir = Path(__file__).parent.parent / 'model_cache'
         os.environ['TRANSFORMERS_CACHE'] = str(cache_dir)
@@ -19,6 +31,11 @@ class AIScriptGenerator:
         )
         set_seed(42)  # For reproducibility
 
+        # GPT-2 has no padding token; pad on the left so prompts of different
+        # lengths can share one batched generate call
+        self.generator.tokenizer.pad_token = self.generator.tokenizer.eos_token
+        self.generator.tokenizer.padding_side = 'left'
+
         # Topics for variety
         self.topics = [
             "success", "motivation", "personal growth",
@@ -27,6 +44,14 @@ class AIScriptGenerator:
             "achievement", "mindset", "determination"
         ]
 
+        # Number of variation candidates sampled per call and their scoring weights
+        unknown = set(variation_weights or {}) - set(self.DEFAULT_VARIATION_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown variation weights: {', '.join(sorted(unknown))}")
+        self.variation_candidates = variation_candidates
+        self.variation_weights = {**self.DEFAULT_VARIATION_WEIGHTS, **(variation_weights or {})}
+        self.last_variation_stats = {}
+
     def _clean_generated_text(self, text, prefix=""):
         """Clean up generated text"""
         # Remove the prefix/prompt if present
@@ -47,63 +72,226 @@ class AIScriptGenerator:
 
         return text.strip()
 
-    def generate_quote(self):
-        """Generate an inspirational quote using AI"""
-        topic = random.choice(self.topics)
-        prompt = f"Write an inspiring quote about {topic} in one sentence:"
+    def generate_quote(self, topics=None):
+        """Generate an inspirational quote using AI, optionally restricted to the given topics"""
+        return self.generate_quotes(1, topics)[0]
+
+    def generate_quotes(self, count, topics=None):
+        """Generate several quotes in one batched pass, returns a list of (quote, topic)"""
+        return self.generate_quotes_about([random.choice(topics or self.topics) for _ in range(count)])
+
+    def generate_quotes_about(self, topics):
+        """Generate one quote per topic in one batched pass"""
+        from .generate_script import get_random_quote
+
+        count = len(topics)
+        prompts = [f"Write an inspiring quote about {topic} in one sentence:" for topic in topics]
 
         try:
             # Generate text with parameters tuned for quotes
-            result = self.generator(
-                prompt,
+            results = self.generator(
+                prompts,
                 max_length=50,
                 num_return_sequences=1,
                 temperature=0.7,
                 top_k=50,
                 do_sample=True,
-                truncation=True
+                truncation=True,
+                batch_size=count
             )
+        except Exception as e:
+            print(f"AI generation failed: {e}")
+            # Fallback to traditional quotes on the same topics if AI fails
+            return [get_random_quote(topic) for topic in topics]
 
+        quotes = []
+        for prompt, topic, result in zip(prompts, topics, results):
             quote = self._clean_generated_text(result[0]['generated_text'], prompt)
 
             # Fallback to traditional quotes if generated text is too short
             if len(quote) < 20:
-                from .generate_script import get_random_quote
-                return get_random_quote()
+                quotes.append(get_random_quote(topic))
+            else:
+                quotes.append((quote, topic))
 
-            return quote, topic
+        return quotes
 
-        except Exception as e:
-            print(f"AI generation failed: {e}")
-            # Fallback to traditional quotes if AI fails
-            from .generate_script import get_random_quote
-            return get_random_quote()
+    def _sample_candidates(self, prompts, num_candidates):
+        """
+        Sample candidates for every prompt in one batched generate call.
+        Returns:
+            list: (texts, mean token log-probabilities) per prompt
+        """
+        model = self.generator.model
+        tokenizer = self.generator.tokenizer
+        inputs = tokenizer(prompts, return_tensors='pt', padding=True)
+        prompt_length = inputs['input_ids'].shape[1]
+
+        with torch.no_grad():
+            sequences = model.generate(
+                **inputs,
+                max_new_tokens=30,
+                num_return_sequences=num_candidates,
+                temperature=0.8,
+                top_k=50,
+                do_sample=True,
+                pad_token_id=tokenizer.eos_token_id
+            )
+
+        generated = sequences[:, prompt_length:]
+        # Ignore everything from the first end-of-text token onwards
+        valid = (generated == tokenizer.eos_token_id).int().cumsum(dim=1) == 0
+        prompt_mask = inputs['attention_mask'].repeat_interleave(num_candidates, dim=0)
+        attention_mask = torch.cat([prompt_mask, valid.long()], dim=1)
+
+        token_scores = self._token_log_probs(sequences, attention_mask, prompt_length)
+        token_scores = torch.where(valid, token_scores, torch.zeros_like(token_scores))
+        mean_log_prob = (token_scores.sum(dim=1) / valid.sum(dim=1).clamp(min=1)).cpu().numpy()
+
+        texts = tokenizer.batch_decode(generated, skip_special_tokens=True)
+        # Sequences come back grouped by prompt, num_candidates at a time
+        return [
+            (texts[i:i + num_candidates], mean_log_prob[i:i + num_candidates])
+            for i in range(0, len(texts), num_candidates)
+        ]
+
+    def _token_log_probs(self, sequences, attention_mask, prompt_length, chunk_size=16):
+        """
+        Log-probability of each generated token under the unmodified model.
+
+        The scores kept by generate() are warped by temperature and top-k, so
+        the sequences are run through the model again (teacher forcing) and
+        scored from the raw logits. Rows are processed in chunks to bound the
+        size of the vocabulary-wide logits tensor.
+        """
+        model = self.generator.model
+        # Left padding shifts the prompts, so positions must follow the mask
+        position_ids = (attention_mask.cumsum(dim=1) - 1).clamp(min=0)
+
+        scores = []
+        with torch.no_grad():
+            for start in range(0, sequences.shape[0], chunk_size):
+                rows = slice(start, start + chunk_size)
+                logits = model(
+                    input_ids=sequences[rows],
+                    attention_mask=attention_mask[rows],
+                    position_ids=position_ids[rows]
+                ).logits
+                # Logits at position i predict token i + 1
+                log_probs = torch.log_softmax(logits[:, prompt_length - 1:-1].float(), dim=-1)
+                targets = sequences[rows, prompt_length:].unsqueeze(-1)
+                scores.append(log_probs.gather(-1, targets).squeeze(-1))
+        return torch.cat(scores, dim=0)
+
+    def _score_candidates(self, candidates, mean_log_prob, seed_quote):
+        """Score all candidates at once, returns one score per candidate"""
+        seed_words = set(re.findall(r"[a-z']+", seed_quote.lower()))
+        lengths = np.array([len(c) for c in candidates], dtype=np.float64)
+
+        overlap = np.array([
+            len(seed_words & words) / max(len(seed_words | words), 1)
+            for words in (set(re.findall(r"[a-z']+", c.lower())) for c in candidates)
+        ])
+        stray = np.array([len(re.findall(r"[^\w\s.,!?;'-]", c)) for c in candidates], dtype=np.float64)
+        ends_cleanly = np.array([c.endswith(('.', '!', '?')) for c in candidates], dtype=np.float64)
+
+        # Same hard limits as the single-sample path
+        rejected = (lengths < 20) | np.array([c.lower() == seed_quote.lower() for c in candidates])
+
+        # Raw probabilities of sampled text are tiny and close together, so
+        # rescale them to [0, 1] across this prompt's usable candidates
+        log_prob = np.asarray(mean_log_prob, dtype=np.float64)
+        usable = log_prob[~rejected] if (~rejected).any() else log_prob
+        spread = usable.max() - usable.min()
+        if spread > 0:
+            likelihood = np.clip((log_prob - usable.min()) / spread, 0, 1)
+        else:
+            likelihood = np.ones_like(log_prob)
+
+        features = np.stack([
+            likelihood,
+            np.clip(1 - np.abs(lengths - len(seed_quote)) / max(len(seed_quote), 1), 0, 1),
+            ends_cleanly * np.clip(1 - stray / np.maximum(lengths, 1) * 10, 0, 1),
+            1 - overlap
+        ], axis=1)
+        weights = np.array([
+            self.variation_weights['likelihood'],
+            self.variation_weights['length'],
+            self.variation_weights['punctuation'],
+            self.variation_weights['distance']
+        ])
+        scores = features @ weights
+        scores[rejected] = -np.inf
+        return scores
 
     def generate_variation(self, seed_quote):
         """Generate a variation of an existing quote"""
-        prompt = f"Rewrite this quote differently: '{seed_quote}'"
+        return self.generate_variations([seed_quote])[0]
+
+    def generate_variations(self, seed_quotes):
+        """Generate a variation for each seed quote in one batched pass"""
+        prompts = [f"Rewrite this quote differently: '{seed_quote}'" for seed_quote in seed_quotes]
+
+        if self.variation_candidates > 1:
+            return self._generate_reranked_variations(seed_quotes, prompts)
 
         try:
-            result = self.generator(
-                prompt,
+            results = self.generator(
+                prompts,
                 max_length=50,
                 num_return_sequences=1,
                 temperature=0.8,
                 top_k=50,
-                do_sample=True
+                do_sample=True,
+                batch_size=len(prompts)
             )
+        except Exception as e:
+            print(f"Variation generation failed: {e}")
+            return list(seed_quotes)
 
+        variations = []
+        for seed_quote, prompt, result in zip(seed_quotes, prompts, results):
             variation = self._clean_generated_text(result[0]['generated_text'], prompt)
 
             # If variation is too similar or too short, return original
             if len(variation) < 20 or variation.lower() == seed_quote.lower():
-                return seed_quote
+                variations.append(seed_quote)
+            else:
+                variations.append(variation)
+
+        return variations
+
+    def _generate_reranked_variations(self, seed_quotes, prompts):
+        """Sample several variations per seed in one batch and keep the best scoring ones"""
+        try:
+            start = time.perf_counter()
+            sampled = self._sample_candidates(prompts, self.variation_candidates)
+
+            variations = []
+            best_scores = []
+            for seed_quote, (texts, mean_log_prob) in zip(seed_quotes, sampled):
+                candidates = [self._clean_generated_text(text) for text in texts]
+                scores = self._score_candidates(candidates, mean_log_prob, seed_quote)
+                best = int(np.argmax(scores))
+                best_scores.append(float(scores[best]))
+                variations.append(candidates[best] if np.isfinite(scores[best]) else seed_quote)
+            elapsed = time.perf_counter() - start
+
+            total = len(seed_quotes) * self.variation_candidates
+            self.last_variation_stats = {
+                'candidates': total,
+                'seconds': elapsed,
+                'candidates_per_second': total / elapsed if elapsed > 0 else float('inf'),
+                'best_scores': best_scores
+            }
+            print(f"Scored {total} variations "
+                  f"({self.last_variation_stats['candidates_per_second']:.1f} candidates/s)")
 
-            return variation
+            return variations
 
         except Exception as e:
             print(f"Variation generation failed: {e}")
-            return seed_quote
+            return list(seed_quotes)
 
 if __name__ == "__main__":
     # Test the AI generator
@@ -111,4 +299,5 @@ if __name__ == "__main__":
     quote, topic = generator.generate_quote()
     print(f"Original Quote ({topic}): {quote}")
     variation = generator.generate_variation(quote)
-    print(f"Variation: {variation}")
\ No newline at end of file
+    print(f"Variation: {variation}")
+    print(f"Variation stats: {generator.last_variation_stats}")
\ No newline at end of file
@@ -1,17 +1,35 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
 import json
 import os
 import asyncio
 from datetime import datetime
+from .telegram_outbox import Outbox
+
+# Most videos collapsed into one digest message
+DIGEST_MAX_VIDEOS = 10
+STATUS_LABELS = {
+    'approved': "✅ Approved",
+    'rejected': "❌ Rejected",
+    'auto': "⏱ Auto-approved"
+}
 
 class ApprovalSystem:
-    def __init__(self, token):
+    def __init__(self, token, base_url=None, config_file='config.json'):
         self.token = token
+        self.base_url = base_url  # Alternative Bot API endpoint, e.g. a local test server
         self.pending_approvals = {}
-        self.config_file = 'config.json'
+        self.decisions = {}  # video_id -> future resolved by handle_callback
+        self.app = None
+        self.bot = None  # Standalone bot used while not polling
+        self.config_file = config_file
         self.load_config()
 
+        # Outbound messages are rate limited and grouped into digests
+        self.outbox = Outbox(rate=self.config.get('messages_per_second', 25))
+        self.video_digests = {}  # video_id -> digest announcing it
+        self._open_digest = None
+
     def load_config(self):
         """Load configuration including admin chat IDs"""
         if os.path.exists(self.config_file):
@@ -20,7 +38,9 @@ class ApprovalSystem:
         else:
             self.config = {
                 'admin_chat_ids': [],  # Add your Telegram chat ID here
-                'auto_approve_after': 30  # Minutes to wait before auto-approval
+                'auto_approve_after': 30,  # Minutes to wait before auto-approval
+                'digest_window': 5,  # Seconds to collect videos into one message
+                'messages_per_second': 25  # Telegram allows about 30 per bot
             }
             self.save_config()
 
@@ -29,6 +49,180 @@ class ApprovalSystem:
         with open(self.config_file, 'w') as f:
             json.dump(self.config, f, indent=4)
 
+    def build_application(self):
+        """Build a Telegram application with the approval handlers registered"""
+        builder = Application.builder().token(self.token)
+        if self.base_url:
+            builder = builder.base_url(self.base_url)
+        app = builder.build()
+
+        app.add_handler(CommandHandler("start", self.start_command))
+        app.add_handler(CommandHandler("register", self.register_command))
+        app.add_handler(CommandHandler("status", self.status_command))
+        app.add_handler(CallbackQueryHandler(self.handle_callback))
+        return app
+
+    async def start_polling(self, poll_interval=0.0):
+        """Receive approval callbacks inside the already running event loop"""
+        app = self.build_application()
+        await app.initialize()
+        await app.start()
+        await app.updater.start_polling(poll_interval=poll_interval)
+        self.app = app
+
+    async def stop_polling(self):
+        """Stop receiving callbacks started with start_polling and close the bot"""
+        if self.app is not None:
+            await self.app.updater.stop()
+            await self.app.stop()
+            await self.app.shutdown()
+            self.app = None
+        if self.bot is not None:
+            await self.bot.shutdown()
+            self.bot = None
+
+    def _resolve_decision(self, video_id, approved):
+        """Wake up the request_approval call waiting on this video"""
+        decision = self.decisions.get(video_id)
+        if decision is not None and not decision.done():
+            decision.set_result(approved)
+
+    async def _bot(self):
+        """Bot for outgoing messages: the polling application's, or one reused standalone bot"""
+        if self.app is not None:
+            return self.app.bot
+        if self.bot is None:
+            self.bot = Bot(self.token, base_url=self.base_url) if self.base_url else Bot(self.token)
+        await self.bot.initialize()  # Returns at once when already initialized
+        return self.bot
+
+    def _decided_text(self, video_info, status):
+        if status == 'rejected':
+            headline = "❌ Video Rejected"
+        elif status == 'auto':
+            headline = "⏱ Video Auto-Approved"
+        else:
+            headline = "✅ Video Approved!"
+        return (
+            f"{headline}\n\n"
+            f"Title: {video_info['title']}\n"
+            f"Category: {video_info['category']}"
+        )
+
+    def _render_digest(self, digest):
+        """Build the message text and keyboard for a digest in its current state"""
+        video_ids = digest['video_ids']
+
+        if len(video_ids) == 1:
+            video_id = video_ids[0]
+            video_info = digest['info'][video_id]
+            status = digest['status'].get(video_id)
+            if status is not None:
+                return self._decided_text(video_info, status), None
+
+            keyboard = [
+                [
+                    InlineKeyboardButton("✅ Approve", callback_data=f"approve_{video_id}"),
+                    InlineKeyboardButton("❌ Reject", callback_data=f"reject_{video_id}")
+                ]
+            ]
+            message = (
+                f"🎥 New Video Ready for Review\n\n"
+                f"Title: {video_info['title']}\n"
+                f"Category: {video_info['category']}\n"
+                f"Quote: {video_info['quote']}\n\n"
+                f"Video file: {video_info['video_path']}"
+            )
+            return message, InlineKeyboardMarkup(keyboard)
+
+        message = f"🎥 {len(video_ids)} New Videos Ready for Review\n"
+        keyboard = []
+        for number, video_id in enumerate(video_ids, 1):
+            video_info = digest['info'][video_id]
+            status = digest['status'].get(video_id)
+            label = f" ({STATUS_LABELS[status]})" if status else ""
+            message += (
+                f"\n{number}. {video_info['title']}{label}\n"
+                f"Category: {video_info['category']}\n"
+                f"Quote: {video_info['quote']}\n"
+                f"Video file: {video_info['video_path']}\n"
+            )
+            if status is None:
+                keyboard.append([
+                    InlineKeyboardButton(f"✅ Approve {number}", callback_data=f"approve_{video_id}"),
+                    InlineKeyboardButton(f"❌ Reject {number}", callback_data=f"reject_{video_id}")
+                ])
+
+        return message, InlineKeyboardMarkup(keyboard) if keyboard else None
+
+    async def _announce(self, video_id):
+        """Add a video to the open digest and wait until that digest has been sent"""
+        digest = self._open_digest
+        if digest is None:
+            loop = asyncio.get_running_loop()
+            digest = {
+                'video_ids': [],
+                'info': {},
+                'status': {},
+                'messages': [],  # (chat_id, message_id) of every admin's copy
+                'closed': False,
+                'sent': loop.create_future()
+            }
+            self._open_digest = digest
+            digest['task'] = loop.create_task(self._send_digest_later(digest))
+
+        digest['video_ids'].append(video_id)
+        digest['info'][video_id] = self.pending_approvals[video_id]
+        self.video_digests[video_id] = digest
+
+        if len(digest['video_ids']) >= DIGEST_MAX_VIDEOS:
+            await self._send_digest(digest)
+        await asyncio.shield(digest['sent'])
+
+    async def _send_digest_later(self, digest):
+        await asyncio.sleep(self.config.get('digest_window', 5))
+        await self._send_digest(digest)
+
+    async def _send_digest(self, digest):
+        """Send a digest to every admin once"""
+        if digest['closed']:
+            return
+        digest['closed'] = True
+        if self._open_digest is digest:
+            self._open_digest = None
+
+        text, markup = self._render_digest(digest)
+        try:
+            try:
+                digest['messages'] = await self.outbox.fan_out(
+                    await self._bot(), self.config['admin_chat_ids'], text, markup
+                )
+            except Exception as e:
+                # Runs in a background task, so nobody else would see this
+                print(f"Failed to send approval request: {e}")
+
+            if not digest['messages']:
+                # Nobody can answer, so treat it like having no admins configured
+                print(f"Approval request for {len(digest['video_ids'])} video(s) reached no admin. "
+                      f"Auto-approving...")
+                for video_id in digest['video_ids']:
+                    if self.pending_approvals.pop(video_id, None) is not None:
+                        self.video_digests.pop(video_id, None)
+                        self._resolve_decision(video_id, True)
+        finally:
+            if not digest['sent'].done():
+                digest['sent'].set_result(len(digest['messages']))
+
+    async def _update_digest(self, bot, video_id, status):
+        """Edit every admin's copy of the digest announcing video_id"""
+        digest = self.video_digests.pop(video_id, None)
+        if digest is None:
+            return False
+        digest['status'][video_id] = status
+        text, markup = self._render_digest(digest)
+        await self.outbox.edit_all(bot, digest['messages'], text, markup)
+        return True
+
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /start command"""
         await update.message.reply_text(
@@ -67,88 +261,64 @@ class ApprovalSystem:
             print("No admin chat IDs configured. Auto-approving...")
             return True
 
-        video_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        video_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        decision = asyncio.get_running_loop().create_future()
+        self.decisions[video_id] = decision
         self.pending_approvals[video_id] = {
             **video_info,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ Approve", callback_data=f"approve_{video_id}"),
-                InlineKeyboardButton("❌ Reject", callback_data=f"reject_{video_id}")
-            ]
-        ]
-        markup = InlineKeyboardMarkup(keyboard)
+        timeout = self.config['auto_approve_after'] * 60
+        try:
+            # Send approval request to all admins, batched with other pending videos
+            await self._announce(video_id)
 
-        message = (
-            f"🎥 New Video Ready for Review\n\n"
-            f"Title: {video_info['title']}\n"
-            f"Category: {video_info['category']}\n"
-            f"Quote: {video_info['quote']}\n\n"
-            f"Video file: {video_info['video_path']}"
-        )
+            if timeout <= 0:
+                # Auto-approval is turned off, wait for an admin however long it takes
+                return await decision
 
-        app = Application.builder().token(self.token).build()
-
-        # Send approval request to all admins
-        for chat_id in self.config['admin_chat_ids']:
+            # Wait for an admin decision, auto-approving after the timeout
             try:
-                await app.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    reply_markup=markup
-                )
-            except Exception as e:
-                print(f"Failed to send approval request to {chat_id}: {e}")
-
-        # Set up auto-approval timer
-        if self.config['auto_approve_after'] > 0:
-            await asyncio.sleep(self.config['auto_approve_after'] * 60)
-            if video_id in self.pending_approvals:
+                return await asyncio.wait_for(asyncio.shield(decision), timeout)
+            except asyncio.TimeoutError:
+                if decision.done():
+                    # An admin decided just as the timeout expired
+                    return decision.result()
+                self.pending_approvals.pop(video_id, None)
                 print(f"Auto-approving video {video_id} after timeout")
+                await self._update_digest(await self._bot(), video_id, 'auto')
                 return True
-
-        return False
+        finally:
+            self.decisions.pop(video_id, None)
+            if not decision.done():
+                # Cancelled or failed, no callback will clean these up any more
+                self.pending_approvals.pop(video_id, None)
+                self.video_digests.pop(video_id, None)
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle approval/rejection callbacks"""
         query = update.callback_query
-        action, video_id = query.data.split('_')
+        action, video_id = query.data.split('_', 1)
 
         if video_id not in self.pending_approvals:
             await query.answer("This approval request has expired.")
             return
 
-        video_info = self.pending_approvals[video_id]
+        video_info = self.pending_approvals.pop(video_id)
+        approved = action == "approve"
+        status = 'approved' if approved else 'rejected'
+        self._resolve_decision(video_id, approved)
+        await query.answer("Video approved!" if approved else "Video rejected!")
 
-        if action == "approve":
-            del self.pending_approvals[video_id]
-            await query.answer("Video approved!")
-            await query.edit_message_text(
-                f"✅ Video Approved!\n\n"
-                f"Title: {video_info['title']}\n"
-                f"Category: {video_info['category']}"
-            )
-            return True
-        else:
-            del self.pending_approvals[video_id]
-            await query.answer("Video rejected!")
-            await query.edit_message_text(
-                f"❌ Video Rejected\n\n"
-                f"Title: {video_info['title']}\n"
-                f"Category: {video_info['category']}"
-            )
-            return False
+        # Update every admin's copy, not just the one that was clicked
+        if not await self._update_digest(context.bot, video_id, status):
+            await query.edit_message_text(self._decided_text(video_info, status))
+        return approved
 
     def run(self):
         """Start the Telegram bot"""
-        app = Application.builder().token(self.token).build()
-
-        app.add_handler(CommandHandler("start", self.start_command))
-        app.add_handler(CommandHandler("register", self.register_command))
-        app.add_handler(CommandHandler("status", self.status_command))
-        app.add_handler(CallbackQueryHandler(self.handle_callback))
+        app = self.build_application()
 
         print("Approval bot is running...")
         app.run_polling()
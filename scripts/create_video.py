@@ -4,6 +4,7 @@ import numpy as np
 import os
 import subprocess
 import sys
+from functools import lru_cache
 from .utils import ensure_ffmpeg
 
 def check_ffmpeg():
@@ -41,11 +42,16 @@ def create_default_background(width=1080, height=1920):
 
     return background
 
-def create_video(background_image, audio_file, output_file):
-    # Ensure ffmpeg is available
-    if not ensure_ffmpeg():
-        raise RuntimeError("Failed to setup ffmpeg")
+def load_background(background_image):
+    """Load, resize and pad a background image, cached per file and modification time"""
+    try:
+        mtime = os.path.getmtime(background_image)
+    except OSError:
+        mtime = None
+    return _prepare_background(background_image, mtime)
 
+@lru_cache(maxsize=32)
+def _prepare_background(background_image, mtime):
     try:
         # Try to load the background image
         img = cv2.imread(background_image)
@@ -94,13 +100,24 @@ def create_video(background_image, audio_file, output_file):
         value=[0, 0, 0]
     )
 
-    # Get audio duration using ffmpeg
-    probe = ffmpeg.probe(audio_file)
-    audio_info = next(s for s in probe['streams'] if s['codec_type'] == 'audio')
-    duration = float(probe['format']['duration'])
+    # Shared between renders through the cache, so it must not be modified
+    return img
+
+def create_video(background_image, audio_file, output_file, duration=None):
+    # Ensure ffmpeg is available
+    if not ensure_ffmpeg():
+        raise RuntimeError("Failed to setup ffmpeg")
+
+    img = load_background(background_image)
+
+    # Get audio duration using ffmpeg, unless the caller already knows it
+    if duration is None:
+        probe = ffmpeg.probe(audio_file)
+        duration = float(probe['format']['duration'])
 
     # Create temporary video without audio
-    temp_video = 'temp_output.mp4'
+    # Per-output temp file so concurrent renders don't overwrite each other
+    temp_video = os.path.splitext(output_file)[0] + '_noaudio.mp4'
     height, width = img.shape[:2]
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(temp_video, fourcc, 30, (width, height))  # 30fps for smoother playback
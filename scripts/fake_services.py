@@ -0,0 +1,320 @@
+"""Local stand-ins for the external services used by the pipeline.
+
+Nothing in here touches the network beyond 127.0.0.1, so the load harness
+(scripts/load_test.py) can run in CI. All latencies are given in virtual
+seconds and divided by ``speed`` before sleeping.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.request
+import wave
+from array import array
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FAKE_BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot'}
+FAKE_ADMIN_USER = {'id': 1000, 'is_bot': False, 'first_name': 'Fake Admin'}
+
+
+class FakeBotAPI:
+    """Minimal Telegram Bot API served over HTTP on localhost.
+
+    Point python-telegram-bot at it with ``base_url=fake.url``. Every video
+    announced through an approve/reject keyboard gets one decision, picked
+    from ``outcomes`` ('approve', 'reject' or 'timeout' -> weight) and
+    delivered through getUpdates as a callback query after
+    ``decision_delay``. The server also accepts uploads on ``/upload``.
+
+    With ``rate_limit`` set, sending or editing more than that many messages
+    per real second is answered with a 429 and ``retry_after``, like Telegram.
+    """
+
+    def __init__(self, speed=1.0, outcomes=None, decision_delay=60.0, api_latency=0.0,
+                 seed=None, rate_limit=None):
+        self.speed = speed
+        self.outcomes = outcomes or {'approve': 1.0}
+        self.decision_delay = decision_delay
+        self.api_latency = api_latency
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+        self.calls = Counter()
+        self.decided = {}
+        self.uploads = 0
+        self.uploaded_bytes = 0
+        self.rate_limited = 0
+        self._recent_messages = deque()
+
+        self._lock = threading.Condition()
+        self._updates = []
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._timers = []
+        self._stopped = False
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/bot"
+
+    @property
+    def upload_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/upload"
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.do_POST()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, payload = api.handle(self.path, self.headers.get('Content-Type', ''), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _sleep(self, virtual_seconds):
+        if virtual_seconds > 0:
+            time.sleep(virtual_seconds / self.speed)
+
+    @staticmethod
+    def _parse_params(url, content_type, body):
+        params = {key: values[-1] for key, values in parse_qs(urlparse(url).query).items()}
+        if 'application/json' in content_type:
+            params.update(json.loads(body or b'{}'))
+        elif body:
+            for key, values in parse_qs(body.decode()).items():
+                value = values[-1]
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+                params[key] = value
+        return params
+
+    def handle(self, url, content_type, body):
+        """Answer one HTTP request, returns (status, json payload)"""
+        path = urlparse(url).path
+        if path == '/upload':
+            self._sleep(self.api_latency)
+            with self._lock:
+                self.uploads += 1
+                self.uploaded_bytes += len(body)
+            return 200, {'ok': True, 'result': {'id': f"video{self.uploads}"}}
+
+        method = path.rsplit('/', 1)[-1]
+        params = self._parse_params(url, content_type, body)
+        self.calls[method] += 1
+        self._sleep(self.api_latency)
+
+        if method in ('sendMessage', 'editMessageText') and self._over_rate_limit():
+            self.rate_limited += 1
+            return 429, {
+                'ok': False,
+                'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1}
+            }
+
+        handler = getattr(self, f"_api_{method}", None)
+        if handler is None:
+            return 200, {'ok': True, 'result': True}
+        return handler(params)
+
+    def _over_rate_limit(self):
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_messages and now - self._recent_messages[0] >= 1.0:
+                self._recent_messages.popleft()
+            if len(self._recent_messages) >= self.rate_limit:
+                return True
+            self._recent_messages.append(now)
+            return False
+
+    def _message(self, params, message_id=None):
+        if message_id is None:
+            with self._lock:
+                message_id = self._next_message_id
+                self._next_message_id += 1
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': FAKE_BOT_USER,
+            'text': params.get('text', '')
+        }
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        return message
+
+    def _api_getMe(self, params):
+        return 200, {'ok': True, 'result': FAKE_BOT_USER}
+
+    def _api_sendMessage(self, params):
+        message = self._message(params)
+        markup = params.get('reply_markup') or {}
+        for row in markup.get('inline_keyboard', []):
+            for button in row:
+                action, _, video_id = button.get('callback_data', '').partition('_')
+                if action in ('approve', 'reject'):
+                    self._schedule_decision(video_id, message)
+        return 200, {'ok': True, 'result': message}
+
+    def _api_editMessageText(self, params):
+        return 200, {'ok': True, 'result': self._message(params, int(params.get('message_id', 0)))}
+
+    def _api_getUpdates(self, params):
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            while not self._updates and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            updates = list(self._updates)
+        return 200, {'ok': True, 'result': updates}
+
+    def _schedule_decision(self, video_id, message):
+        with self._lock:
+            if video_id in self.decided:
+                return
+            names = list(self.outcomes)
+            outcome = self.random.choices(names, weights=[self.outcomes[n] for n in names])[0]
+            self.decided[video_id] = outcome
+        if outcome == 'timeout':
+            return
+
+        timer = threading.Timer(
+            self.decision_delay / self.speed, self._push_callback, (outcome, video_id, message)
+        )
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+
+    def _push_callback(self, action, video_id, message):
+        with self._lock:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append({
+                'update_id': update_id,
+                'callback_query': {
+                    'id': str(update_id),
+                    'from': FAKE_ADMIN_USER,
+                    'chat_instance': 'fake',
+                    'data': f"{action}_{video_id}",
+                    'message': message
+                }
+            })
+            self._lock.notify_all()
+
+
+class FakeTTS:
+    """Stand-in for text_to_speech that writes a synthetic narration as WAV.
+
+    The clip is a quiet tone sized like gTTS output (about ``chars_per_second``
+    characters per second) with ``padding`` seconds of silence on each end.
+    ffmpeg detects the format from the content, so the .mp3 name is fine.
+    """
+
+    def __init__(self, latency=2.0, speed=1.0, chars_per_second=14.0, padding=0.5, sample_rate=24000):
+        self.latency = latency
+        self.speed = speed
+        self.chars_per_second = chars_per_second
+        self.padding = padding
+        self.sample_rate = sample_rate
+
+    def __call__(self, text, output_file):
+        time.sleep(self.latency / self.speed)
+
+        speech = max(len(text) / self.chars_per_second, 1.0)
+        silence = array('h', bytes(2 * int(self.padding * self.sample_rate)))
+        step = 2 * math.pi * 220 / self.sample_rate
+        tone = array('h', (int(8000 * math.sin(step * i)) for i in range(int(speech * self.sample_rate))))
+
+        with wave.open(output_file, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(silence.tobytes() + tone.tobytes() + silence.tobytes())
+
+
+class FakeRenderer:
+    """Stand-in for create_video that writes a file sized like the real encode"""
+
+    def __init__(self, latency=5.0, speed=1.0, bitrate=2_628_000):
+        self.latency = latency
+        self.speed = speed
+        self.bitrate = bitrate  # Video plus audio bits per second
+
+    def __call__(self, background_image, audio_file, output_file, duration=None):
+        time.sleep(self.latency / self.speed)
+        if duration is None:
+            with wave.open(audio_file, 'rb') as f:
+                duration = f.getnframes() / f.getframerate()
+        with open(output_file, 'wb') as f:
+            f.truncate(int(duration * self.bitrate / 8))
+
+
+class FakeUploader:
+    """Stand-in for upload_to_youtube that posts the file to a local endpoint"""
+
+    def __init__(self, url, latency=10.0, speed=1.0):
+        self.url = url
+        self.latency = latency
+        self.speed = speed
+
+    def __call__(self, video_file, title, description):
+        time.sleep(self.latency / self.speed)
+        with open(video_file, 'rb') as f:
+            request = urllib.request.Request(self.url, data=f.read(), headers={'Content-Type': 'video/mp4'})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read())['result']['id']
+
+
+def directory_size(path):
+    """Total size in bytes of all files below path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
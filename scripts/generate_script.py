@@ -31,6 +31,28 @@ QUOTES = {
     ]
 }
 
+CATEGORIES = tuple(QUOTES.keys())
+
+# Optional external corpus, see load_quote_corpus()
+_corpus = None
+_corpus_weights = None
+
+def load_quote_corpus(path, weights=None):
+    """
+    Use a large JSONL/CSV quote file instead of the built-in quotes.
+    Args:
+        path (str): Path to the quote file
+        weights (dict, optional): Category -> weight mix for uncategorized draws
+    """
+    global _corpus, _corpus_weights
+    from .quote_corpus import QuoteCorpus
+
+    if _corpus is not None:
+        _corpus.close()
+    _corpus = QuoteCorpus(path)
+    _corpus_weights = weights
+    return _corpus
+
 def get_random_quote(category=None):
     """
     Get a random motivational quote.
@@ -39,11 +61,14 @@ def get_random_quote(category=None):
     Returns:
         tuple: (quote, category)
     """
+    if _corpus is not None:
+        return _corpus.draw(category, weights=_corpus_weights)
+
     if category and category in QUOTES:
         quotes_list = QUOTES[category]
     else:
         # If no category specified or invalid category, choose from all categories
-        category = random.choice(list(QUOTES.keys()))
+        category = random.choice(CATEGORIES)
         quotes_list = QUOTES[category]
 
     quote = random.choice(quotes_list)
@@ -0,0 +1,306 @@
+"""End-to-end load harness for AutomatedYouTubeShorts.
+
+Runs the real scheduler pipeline against the local stand-ins from
+scripts/fake_services.py on an accelerated virtual clock:
+
+    python -m scripts.load_test --videos 50 --rate 60 --speed 120 --fake-render
+
+Waits (TTS, approvals, uploads, arrivals) are compressed by ``--speed``.
+Compute stages (quote generation and, without --fake-render, the real
+render) run at normal speed and are reported in real seconds; the rate is
+therefore a lower bound when compute dominates.
+
+By default jobs arrive at ``--rate`` per virtual hour, so the reported rate
+is the throughput achieved at that offered load. With ``--closed-loop`` a
+new job is queued as soon as a worker takes one, which measures the
+saturated throughput the pipeline can sustain.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from auto_scheduler import AutomatedYouTubeShorts
+from scripts.approval_system import ApprovalSystem
+from scripts.fake_services import FakeBotAPI, FakeRenderer, FakeTTS, FakeUploader, directory_size
+from scripts.generate_script import get_random_quote
+from scripts.model_server import ModelClient
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FAKE_TOKEN = '123456:LOADTEST'
+
+
+class QuoteStandIn:
+    """Model-free generator used by default so the harness needs no download"""
+
+    def generate_quote(self, topics=None):
+        return get_random_quote()
+
+    def generate_variation(self, seed_quote):
+        return seed_quote
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.latencies = defaultdict(list)
+        self.clocks = {}
+        self.outcomes = defaultdict(int)
+        self.queue_depths = []
+        self.peak_disk = 0
+        self.seconds_saved = []
+
+    def _timed(self, stage, func, virtual):
+        """Wrap a blocking stage so its latency is recorded"""
+        self.clocks[stage] = 'virtual' if virtual else 'real'
+        scale = self.args.speed if virtual else 1.0
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.latencies[stage].append((time.perf_counter() - start) * scale)
+        return wrapper
+
+    def _timed_async(self, stage, func):
+        self.clocks[stage] = 'virtual'
+
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.latencies[stage].append((time.perf_counter() - start) * self.args.speed)
+        return wrapper
+
+    def build_pipeline(self, fake_api):
+        args = self.args
+        config = {
+            'admin_chat_ids': list(range(1, args.admins + 1)),
+            # Minutes, compressed to the virtual clock
+            'auto_approve_after': args.approval_timeout / 60 / args.speed,
+            'digest_window': args.digest_window / args.speed
+        }
+        with open('config.json', 'w') as f:
+            json.dump(config, f, indent=4)
+
+        approval_system = ApprovalSystem(FAKE_TOKEN, base_url=fake_api.url)
+        generator = ModelClient(args.model_socket) if args.model_socket else QuoteStandIn()
+        shorts = AutomatedYouTubeShorts(FAKE_TOKEN, ai_generator=generator, approval_system=approval_system)
+
+        generator.generate_quote = self._timed('generate', generator.generate_quote, virtual=False)
+        shorts.text_to_speech = self._timed(
+            'tts', FakeTTS(args.tts_latency, args.speed), virtual=True
+        )
+        prepare_audio = self._timed('audio_prep', shorts.prepare_audio, virtual=False)
+
+        def prepare_and_record(*prepare_args):
+            result = prepare_audio(*prepare_args)
+            self.seconds_saved.append(result['seconds_saved'])
+            return result
+        shorts.prepare_audio = prepare_and_record
+        if args.fake_render:
+            renderer = self._timed('render', FakeRenderer(args.render_latency, args.speed), virtual=True)
+        else:
+            renderer = self._timed('render', shorts.create_video, virtual=False)
+        shorts.create_video = renderer
+        shorts.upload_to_youtube = self._timed(
+            'upload', FakeUploader(fake_api.upload_url, args.upload_latency, args.speed), virtual=True
+        )
+        approval_system.request_approval = self._timed_async('approval', approval_system.request_approval)
+        return shorts
+
+    async def _producer(self, queue):
+        # Closed loop: the bounded queue makes put() wait for a free worker
+        interval = 0 if self.args.closed_loop else 3600 / self.args.rate / self.args.speed
+        for job in range(self.args.videos):
+            await queue.put(job)
+            await asyncio.sleep(interval)
+
+    async def _worker(self, queue, shorts):
+        while True:
+            await queue.get()
+            start = time.perf_counter()
+            result = await shorts.create_and_approve_video()
+            self.latencies['end_to_end'].append((time.perf_counter() - start) * self.args.speed)
+            self.clocks['end_to_end'] = 'virtual'
+            self.outcomes['approved' if result else 'rejected' if result is False else 'failed'] += 1
+            queue.task_done()
+
+    async def _sampler(self, queue, workdir):
+        while True:
+            self.queue_depths.append(queue.qsize())
+            self.peak_disk = max(self.peak_disk, directory_size(workdir))
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def run_async(self, workdir):
+        args = self.args
+        fake_api = FakeBotAPI(
+            speed=args.speed,
+            outcomes={'approve': args.approve, 'reject': args.reject, 'timeout': args.timeout},
+            decision_delay=args.decision_delay,
+            api_latency=args.api_latency,
+            seed=args.seed,
+            rate_limit=args.rate_limit
+        ).start()
+        try:
+            shorts = self.build_pipeline(fake_api)
+            await shorts.approval_system.start_polling()
+
+            queue = asyncio.Queue(maxsize=1 if args.closed_loop else 0)
+            workers = [asyncio.create_task(self._worker(queue, shorts)) for _ in range(args.workers)]
+            sampler = asyncio.create_task(self._sampler(queue, workdir))
+
+            start = time.perf_counter()
+            await self._producer(queue)
+            await queue.join()
+            elapsed = time.perf_counter() - start
+
+            for task in workers + [sampler]:
+                task.cancel()
+            await shorts.approval_system.stop_polling()
+        finally:
+            fake_api.stop()
+
+        return self.report(elapsed, fake_api)
+
+    def report(self, elapsed, fake_api):
+        virtual_hours = elapsed * self.args.speed / 3600
+        completed = self.outcomes['approved'] + self.outcomes['rejected']
+        stages = {}
+        for stage, values in self.latencies.items():
+            stages[stage] = {
+                'clock': self.clocks[stage],
+                'count': len(values),
+                'p50': percentile(values, 0.5),
+                'p90': percentile(values, 0.9),
+                'p99': percentile(values, 0.99),
+                'max': max(values) if values else 0.0
+            }
+
+        peak_rss = None
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+        return {
+            'videos': self.args.videos,
+            'mode': 'closed-loop' if self.args.closed_loop else 'open-loop',
+            'offered_rate': None if self.args.closed_loop else self.args.rate,
+            'outcomes': dict(self.outcomes),
+            'real_seconds': elapsed,
+            'virtual_hours': virtual_hours,
+            'videos_per_hour': completed / virtual_hours if virtual_hours else 0.0,
+            'stages': stages,
+            'audio_seconds_saved': {
+                'total': sum(self.seconds_saved),
+                'mean': sum(self.seconds_saved) / len(self.seconds_saved) if self.seconds_saved else 0.0
+            },
+            'queue_depth': {
+                'max': max(self.queue_depths, default=0),
+                'mean': sum(self.queue_depths) / len(self.queue_depths) if self.queue_depths else 0.0
+            },
+            'peak_python_bytes': tracemalloc.get_traced_memory()[1],
+            'peak_rss_bytes': peak_rss,
+            'peak_disk_bytes': self.peak_disk,
+            'telegram_calls': dict(fake_api.calls),
+            'uploaded_bytes': fake_api.uploaded_bytes
+        }
+
+    def run(self):
+        """Run the harness in a scratch directory and return the report"""
+        original_dir = os.getcwd()
+        workdir = tempfile.mkdtemp(prefix='yt_load_test_')
+        tracemalloc.start()
+        try:
+            os.chdir(workdir)
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log) if self.args.quiet else contextlib.nullcontext():
+                return asyncio.run(self.run_async(workdir))
+        finally:
+            tracemalloc.stop()
+            os.chdir(original_dir)
+            if not self.args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    print("\nLoad test results")
+    print(f"Videos: {report['videos']}  Outcomes: {report['outcomes']}")
+    print(f"Elapsed: {report['real_seconds']:.1f}s real / {report['virtual_hours']:.2f}h virtual")
+    if report['mode'] == 'closed-loop':
+        print(f"Saturated throughput: {report['videos_per_hour']:.1f} videos/hour")
+    else:
+        print(f"Achieved throughput: {report['videos_per_hour']:.1f} videos/hour "
+              f"at an offered load of {report['offered_rate']:.1f} videos/hour "
+              f"(use --closed-loop for the sustainable maximum)")
+    print(f"Silence trimmed: {report['audio_seconds_saved']['mean']:.2f}s per video, "
+          f"{report['audio_seconds_saved']['total']:.1f}s total")
+    print(f"Queue depth: max {report['queue_depth']['max']}, mean {report['queue_depth']['mean']:.2f}")
+
+    print(f"\n{'stage':<12}{'clock':<9}{'count':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:<12}{s['clock']:<9}{s['count']:>6}"
+              f"{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+
+    print(f"\nPeak Python memory: {report['peak_python_bytes'] / 2**20:.1f} MiB")
+    if report['peak_rss_bytes'] is not None:
+        print(f"Peak RSS: {report['peak_rss_bytes'] / 2**20:.1f} MiB")
+    print(f"Peak disk usage: {report['peak_disk_bytes'] / 2**20:.1f} MiB")
+    print(f"Telegram calls: {report['telegram_calls']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Load test the YouTube Shorts pipeline against local stand-ins')
+    parser.add_argument('--videos', type=int, default=20, help='Number of videos to produce')
+    parser.add_argument('--rate', type=float, default=30, help='Video requests per virtual hour')
+    parser.add_argument('--closed-loop', action='store_true',
+                        help='Queue a new job whenever a worker is free, ignoring --rate')
+    parser.add_argument('--workers', type=int, default=2, help='Concurrent pipeline runs')
+    parser.add_argument('--speed', type=float, default=60, help='Virtual seconds per real second')
+    parser.add_argument('--admins', type=int, default=1, help='Number of fake admin chats')
+    parser.add_argument('--approve', type=float, default=0.8, help='Weight of approve decisions')
+    parser.add_argument('--reject', type=float, default=0.1, help='Weight of reject decisions')
+    parser.add_argument('--timeout', type=float, default=0.1, help='Weight of admins never answering')
+    parser.add_argument('--decision-delay', type=float, default=120, help='Virtual seconds until an admin decides')
+    parser.add_argument('--approval-timeout', type=float, default=600, help='Virtual seconds before auto-approval')
+    parser.add_argument('--digest-window', type=float, default=5, help='Virtual seconds to batch approval requests')
+    parser.add_argument('--tts-latency', type=float, default=2, help='Virtual seconds per TTS call')
+    parser.add_argument('--render-latency', type=float, default=20, help='Virtual seconds per fake render')
+    parser.add_argument('--upload-latency', type=float, default=30, help='Virtual seconds per upload')
+    parser.add_argument('--api-latency', type=float, default=0.2, help='Virtual seconds per Bot API call')
+    parser.add_argument('--rate-limit', type=float, help='Bot API messages per real second before 429s')
+    parser.add_argument('--fake-render', action='store_true', help='Skip ffmpeg and write placeholder videos')
+    parser.add_argument('--model-socket', help='Use the shared model server instead of preset quotes')
+    parser.add_argument('--sample-interval', type=float, default=0.1, help='Real seconds between queue/disk samples')
+    parser.add_argument('--seed', type=int, help='Seed for the fake admin decisions')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch directory')
+    parser.add_argument('--quiet', action='store_true', help='Hide pipeline output')
+    args = parser.parse_args()
+
+    report = LoadTest(args).run()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .generate_script import load_quote_corpus
+from .utils import parse_weights
+
+DEFAULT_SOCKET = str(Path(tempfile.gettempdir()) / 'yt_automation_model.sock')
+
+METHODS = ('generate_quote', 'generate_variation', 'ping')
+
+# Errors meaning nobody is listening on the socket; timeouts are not included
+SERVER_NOT_RUNNING = (FileNotFoundError, ConnectionRefusedError)
+
+
+class ModelServer:
+    """Loads AIScriptGenerator once and serves it over a Unix socket.
+
+    Each connection sends one JSON request line and receives one JSON
+    response line. Requests arriving within ``batch_window`` seconds of each
+    other are coalesced into a single batched generate call.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, batch_window=0.02, max_batch=16, generator=None,
+                 generator_options=None):
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.generator = generator
+        # Keyword arguments for AIScriptGenerator, e.g. variation_candidates
+        self.generator_options = generator_options or {}
+        self.queue = None
+        # The model is not thread-safe, so batches run one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats = {'requests': 0, 'batches': 0}
+
+    def _run_batch(self, method, args):
+        if method == 'generate_quote':
+            # Each request may restrict the topics, e.g. per channel
+            topics = [random.choice(arg.get('topics') or self.generator.topics) for arg in args]
+            return [list(quote) for quote in self.generator.generate_quotes_about(topics)]
+        return self.generator.generate_variations([arg['seed_quote'] for arg in args])
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            for method in ('generate_quote', 'generate_variation'):
+                items = [item for item in batch if item[0] == method]
+                if not items:
+                    continue
+                self.stats['batches'] += 1
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, self._run_batch, method, [item[1] for item in items]
+                    )
+                except Exception as e:
+                    for _, _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, _, future), result in zip(items, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    async def handle_client(self, reader, writer):
+        """Answer a single request on a client connection"""
+        try:
+            request = json.loads(await reader.readline())
+            method = request.get('method')
+            if method not in METHODS:
+                response = {'error': f"Unknown method: {method}"}
+            elif method == 'ping':
+                response = {'result': {'pid': os.getpid(), **self.stats}}
+            else:
+                self.stats['requests'] += 1
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((method, request, future))
+                response = {'result': await future}
+        except Exception as e:
+            response = {'error': str(e)}
+
+        try:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def _remove_stale_socket(self):
+        """Delete a socket file left behind by a previous run, refusing to replace a live server"""
+        if not os.path.exists(self.socket_path):
+            return
+        if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+            raise RuntimeError(f"{self.socket_path} exists and is not a socket")
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            try:
+                sock.connect(self.socket_path)
+            except ConnectionRefusedError:
+                # Nobody is listening, the file is left over
+                os.remove(self.socket_path)
+                return
+        raise RuntimeError(f"A model server is already running on {self.socket_path}")
+
+    async def serve(self):
+        # Check before loading the model, a second copy is what the server avoids
+        self._remove_stale_socket()
+        if self.generator is None:
+            from .ai_generator import AIScriptGenerator
+            self.generator = AIScriptGenerator(**self.generator_options)
+
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batch_loop())
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        print(f"Model server listening on {self.socket_path}")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def run(self):
+        """Run the server until interrupted"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("Model server stopped")
+        except RuntimeError as e:
+            print(f"Model server not started: {e}")
+
+
+class ModelClient:
+    """Drop-in replacement for AIScriptGenerator backed by a ModelServer.
+
+    If no server is running the client loads the model in-process on first
+    use and keeps working without it; the server is retried on every call so
+    a restarted server is picked up again. A server that is running but does
+    not answer within ``request_timeout`` raises instead, since loading a
+    second copy of the model would only add to the load.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, connect_timeout=1.0, request_timeout=120.0,
+                 generator_options=None):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        # Used for the in-process fallback only, the server has its own options
+        self.generator_options = generator_options or {}
+        self._local = None
+        # The in-process model is not thread-safe
+        self._local_lock = threading.Lock()
+
+    @property
+    def local_generator(self):
+        if self._local is None:
+            from .ai_generator import AIScriptGenerator
+            self._local = AIScriptGenerator(**self.generator_options)
+        return self._local
+
+    def _call(self, method, **kwargs):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise FileNotFoundError("Unix sockets are not supported on this platform")
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.connect_timeout)
+            sock.connect(self.socket_path)
+            sock.settimeout(self.request_timeout)
+            sock.sendall(json.dumps({'method': method, **kwargs}).encode() + b'\n')
+            with sock.makefile('rb') as response_file:
+                response = json.loads(response_file.readline())
+
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def ping(self):
+        """Return the server stats, or None if the server is not reachable"""
+        try:
+            return self._call('ping')
+        except (OSError, ValueError, RuntimeError):
+            return None
+
+    def generate_quote(self, topics=None):
+        try:
+            quote, topic = self._call('generate_quote', topics=topics)
+            return quote, topic
+        except SERVER_NOT_RUNNING as e:
+            print(f"Model server unavailable ({e}), generating in-process")
+            with self._local_lock:
+                return self.local_generator.generate_quote(topics)
+
+    def generate_variation(self, seed_quote):
+        try:
+            return self._call('generate_variation', seed_quote=seed_quote)
+        except SERVER_NOT_RUNNING as e:
+            print(f"Model server unavailable ({e}), generating in-process")
+            with self._local_lock:
+                return self.local_generator.generate_variation(seed_quote)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Shared AI model server')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Unix socket path')
+    parser.add_argument('--batch-window', type=float, default=0.02, help='Seconds to wait for a batch to fill')
+    parser.add_argument('--max-batch', type=int, default=16, help='Maximum requests per batch')
+    parser.add_argument('--variation-candidates', type=int, default=8,
+                        help='Variations sampled and reranked per request, 1 disables reranking')
+    parser.add_argument('--variation-weights',
+                        help='Reranking weights, e.g. likelihood=1,length=0.5,punctuation=0.5,distance=1')
+    parser.add_argument('--quotes', help='JSONL/CSV quote corpus used for fallback quotes')
+    parser.add_argument('--quote-weights', help='Category mix for the corpus, e.g. motivation=3,success=1')
+    parser.add_argument('--ping', action='store_true', help='Check whether a server is running')
+    args = parser.parse_args()
+
+    if args.ping:
+        start = time.perf_counter()
+        stats = ModelClient(args.socket).ping()
+        if stats is None:
+            print("Model server is not running")
+        else:
+            print(f"Model server is up ({(time.perf_counter() - start) * 1000:.1f} ms): {stats}")
+    else:
+        if args.quotes:
+            # Quotes the model falls back to are drawn here, not in the clients
+            load_quote_corpus(args.quotes, parse_weights(args.quote_weights) if args.quote_weights else None)
+
+        generator_options = {'variation_candidates': args.variation_candidates}
+        if args.variation_weights:
+            generator_options['variation_weights'] = parse_weights(args.variation_weights)
+        ModelServer(args.socket, args.batch_window, args.max_batch, generator_options=generator_options).run()
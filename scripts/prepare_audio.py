@@ -0,0 +1,200 @@
+import subprocess
+import wave
+
+import numpy as np
+
+from .utils import ensure_ffmpeg
+
+SAMPLE_RATE = 24000  # gTTS output rate
+FRAME_SECONDS = 0.02  # Energy frames used for silence detection
+LOUDNESS_BLOCK_SECONDS = 0.4  # Gating block length borrowed from ITU-R BS.1770
+BLOCK_FRAMES = 500  # Frames decoded per read, 10 seconds of audio
+
+# Loudness histogram, fixed size so memory does not grow with input length
+HISTOGRAM_MIN = -70.0
+HISTOGRAM_STEP = 0.1
+HISTOGRAM_BINS = int(-HISTOGRAM_MIN / HISTOGRAM_STEP)
+
+
+def _decode_blocks(audio_file, sample_rate):
+    """Yield the audio as float32 mono blocks decoded by ffmpeg"""
+    process = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', audio_file, '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), '-'],
+        stdout=subprocess.PIPE
+    )
+    block_bytes = 2 * int(sample_rate * FRAME_SECONDS) * BLOCK_FRAMES
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            # A read can end mid-sample at end of stream
+            data = data[:len(data) - len(data) % 2]
+            yield np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {audio_file}")
+
+
+def _loudness(counts, energy_sums, gate):
+    """Approximate loudness of all histogram blocks at or above gate, None if there are none"""
+    first = int(np.clip(np.ceil((gate - HISTOGRAM_MIN) / HISTOGRAM_STEP), 0, HISTOGRAM_BINS))
+    count = counts[first:].sum()
+    if count == 0:
+        return None
+    return float(-0.691 + 10 * np.log10(energy_sums[first:].sum() / count))
+
+
+def analyze_audio(audio_file, silence_threshold=-45.0, sample_rate=SAMPLE_RATE):
+    """
+    Measure speech bounds and loudness in one streaming pass.
+
+    Loudness follows the BS.1770 gating on non-overlapping 400 ms blocks but
+    skips the K-weighting filter, so it is an unweighted approximation of
+    LUFS. That is close enough to level narrations from one TTS voice, but it
+    is not a compliant loudness measurement.
+    Args:
+        audio_file (str): Any file ffmpeg can decode
+        silence_threshold (float): Frame level in dBFS below which audio counts as silence
+    Returns:
+        dict: total_samples, first/last voiced frame, peak level and approximate loudness
+    """
+    frame_length = int(sample_rate * FRAME_SECONDS)
+    frames_per_loudness_block = int(LOUDNESS_BLOCK_SECONDS / FRAME_SECONDS)
+    threshold = 10 ** (silence_threshold / 10)  # Mean square equivalent of the dBFS level
+
+    counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    energy_sums = np.zeros(HISTOGRAM_BINS, dtype=np.float64)
+
+    total_samples = 0
+    frame_index = 0
+    first_voiced = None
+    last_voiced = None
+    peak = 0.0
+    leftover = np.zeros(0, dtype=np.float32)
+    pending_frames = np.zeros(0, dtype=np.float64)
+
+    def add_frames(frame_energy):
+        nonlocal frame_index, first_voiced, last_voiced, pending_frames
+        voiced = np.flatnonzero(frame_energy > threshold)
+        if voiced.size:
+            if first_voiced is None:
+                first_voiced = frame_index + int(voiced[0])
+            last_voiced = frame_index + int(voiced[-1])
+        frame_index += frame_energy.size
+
+        # Group frames into 400 ms loudness blocks and bin them by level
+        pending_frames = np.concatenate([pending_frames, frame_energy])
+        usable = pending_frames.size - pending_frames.size % frames_per_loudness_block
+        if usable:
+            blocks = pending_frames[:usable].reshape(-1, frames_per_loudness_block).mean(axis=1)
+            pending_frames = pending_frames[usable:]
+            level = -0.691 + 10 * np.log10(np.maximum(blocks, 1e-12))
+            gated = level >= HISTOGRAM_MIN
+            bins = np.minimum(((level[gated] - HISTOGRAM_MIN) / HISTOGRAM_STEP).astype(np.int64), HISTOGRAM_BINS - 1)
+            np.add.at(counts, bins, 1)
+            np.add.at(energy_sums, bins, blocks[gated])
+
+    for block in _decode_blocks(audio_file, sample_rate):
+        total_samples += block.size
+        if block.size:
+            peak = max(peak, float(np.abs(block).max()))
+
+        samples = np.concatenate([leftover, block])
+        usable = samples.size - samples.size % frame_length
+        leftover = samples[usable:]
+        if usable:
+            frames = samples[:usable].reshape(-1, frame_length)
+            add_frames(np.mean(frames.astype(np.float64) ** 2, axis=1))
+
+    if leftover.size:
+        add_frames(np.array([np.mean(leftover.astype(np.float64) ** 2)]))
+
+    # Two-stage gating: absolute at -70, then 10 dB below the ungated result
+    loudness = _loudness(counts, energy_sums, HISTOGRAM_MIN)
+    if loudness is not None:
+        loudness = _loudness(counts, energy_sums, loudness - 10)
+
+    return {
+        'total_samples': total_samples,
+        'frame_length': frame_length,
+        'first_voiced_frame': first_voiced,
+        'last_voiced_frame': last_voiced,
+        'peak_db': float(20 * np.log10(peak)) if peak > 0 else None,
+        'loudness': loudness
+    }
+
+
+def prepare_audio(audio_file, output_file, target_lufs=-16.0, silence_threshold=-45.0,
+                  padding=0.15, max_peak_db=-1.0, sample_rate=SAMPLE_RATE):
+    """
+    Trim leading/trailing silence of a narration and normalize its
+    approximate (unweighted) loudness.
+
+    The input is decoded twice in fixed-size blocks (analysis, then writing),
+    so memory use does not depend on the input length. The result is written
+    as 16-bit mono WAV.
+    Args:
+        audio_file (str): Narration from text_to_speech
+        output_file (str): Path of the prepared WAV file
+        target_lufs (float): Approximate loudness to normalize towards, see analyze_audio
+        silence_threshold (float): Frame level in dBFS treated as silence
+        padding (float): Seconds of silence kept before and after speech
+        max_peak_db (float): Gain is capped so peaks stay below this level
+    Returns:
+        dict: duration, original_duration, seconds_saved, loudness, gain_db
+    """
+    if not ensure_ffmpeg():
+        raise RuntimeError("Failed to setup ffmpeg")
+
+    analysis = analyze_audio(audio_file, silence_threshold, sample_rate)
+    total = analysis['total_samples']
+    frame_length = analysis['frame_length']
+    pad = int(padding * sample_rate)
+
+    if analysis['first_voiced_frame'] is None:
+        # Nothing above the threshold, keep the clip as it is
+        start, end = 0, total
+    else:
+        start = max(0, analysis['first_voiced_frame'] * frame_length - pad)
+        end = min(total, (analysis['last_voiced_frame'] + 1) * frame_length + pad)
+
+    gain_db = 0.0
+    if analysis['loudness'] is not None:
+        gain_db = target_lufs - analysis['loudness']
+        if analysis['peak_db'] is not None:
+            gain_db = min(gain_db, max_peak_db - analysis['peak_db'])
+    gain = np.float32(10 ** (gain_db / 20))
+
+    position = 0
+    with wave.open(output_file, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        for block in _decode_blocks(audio_file, sample_rate):
+            block_start = position
+            position += block.size
+            if position <= start or block_start >= end:
+                continue
+            kept = block[max(start - block_start, 0):min(end - block_start, block.size)]
+            samples = np.clip(kept * gain * 32768.0, -32768, 32767).astype('<i2')
+            out.writeframes(samples.tobytes())
+
+    original_duration = total / sample_rate
+    duration = (end - start) / sample_rate
+    return {
+        'duration': duration,
+        'original_duration': original_duration,
+        'seconds_saved': original_duration - duration,
+        'loudness': analysis['loudness'],
+        'gain_db': gain_db
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    stats = prepare_audio(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "prepared.wav")
+    print(f"Trimmed {stats['seconds_saved']:.2f}s of silence "
+          f"({stats['original_duration']:.2f}s -> {stats['duration']:.2f}s), "
+          f"gain {stats['gain_db']:+.1f} dB")
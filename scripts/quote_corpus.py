@@ -0,0 +1,346 @@
+import csv
+import hashlib
+import json
+import mmap
+import os
+import random
+import threading
+from array import array
+from itertools import accumulate
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+INDEX_VERSION = 2
+FEISTEL_ROUNDS = 4
+OFFSET_SIZE = array('Q').itemsize
+STATE_RECORD_SIZE = 3 * OFFSET_SIZE  # seed, epoch, position
+
+
+class ShuffleBag:
+    """Lazy random permutation of range(size) drawn one index at a time.
+
+    The permutation is a keyed Feistel network with cycle-walking, so only
+    (seed, epoch, position) has to be stored no matter how large the bag is.
+    Every index is returned exactly once per epoch before a new epoch starts.
+    """
+
+    def __init__(self, size, seed, epoch=0, position=0):
+        self.size = size
+        self.seed = seed
+        self.epoch = epoch
+        self.position = position
+
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+
+    def _round(self, value, round_no):
+        key = f"{self.seed}:{self.epoch}:{round_no}:{value}".encode()
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        return int.from_bytes(digest, 'little') & self.half_mask
+
+    def _permute(self, index):
+        left = index >> self.half_bits
+        right = index & self.half_mask
+        for round_no in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(right, round_no)
+        return (left << self.half_bits) | right
+
+    def draw(self):
+        """Return the next index of the bag, refilling it when empty"""
+        if self.position >= self.size:
+            self.epoch += 1
+            self.position = 0
+
+        # Cycle-walk until the permuted value falls inside the bag
+        value = self._permute(self.position)
+        while value >= self.size:
+            value = self._permute(value)
+
+        self.position += 1
+        return value
+
+    def state(self):
+        return {'seed': self.seed, 'epoch': self.epoch, 'position': self.position}
+
+
+class QuoteCorpus:
+    """Memory-mapped quote file with a line offset index grouped by category.
+
+    Supported sources are JSONL (one object per line with a ``quote`` or
+    ``text`` field and a ``category`` field) and CSV with a header row
+    containing the same columns. CSV fields must not span several lines.
+
+    The index is a single file of 64-bit line offsets, sorted by category,
+    with each category's start and count in ``index.json``. It is built in
+    two streaming passes and rebuilt whenever the source file changes.
+    The source, the offsets and the shuffle-bag state are each memory-mapped
+    once, so opening a corpus costs the same for a hundred quotes as for
+    millions, and only three files are held open however many categories
+    there are.
+
+    Several processes may draw from the same corpus (e.g. the model server
+    and the scheduler): every draw re-reads its category's state record
+    under an exclusive lock on the state file, so they share one bag. The
+    lock needs fcntl, so on Windows a corpus is limited to one process.
+    """
+
+    def __init__(self, path, index_dir=None, state_file=None):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Quote corpus not found: {self.path}")
+
+        self.format = 'csv' if self.path.suffix.lower() == '.csv' else 'jsonl'
+        self.index_dir = Path(index_dir) if index_dir else self.path.with_name(self.path.name + '.idx')
+        self.state_file = Path(state_file) if state_file else self.index_dir / 'bag_state.bin'
+
+        self._file = None
+        self._data = None
+        self._offset_file = None
+        self._offset_map = None
+        self._offsets = None
+        self._state_file = None
+        self._state_map = None
+        self._state = None
+        # Serializes draws between threads; flock does the same between processes
+        self._lock = threading.Lock()
+
+        self.meta = self._load_or_build_index()
+        self.categories = tuple(self.meta['categories'])
+        # Cumulative sizes so uncategorized draws weight every quote equally
+        self._cumulative_counts = list(accumulate(
+            self.meta['categories'][name]['count'] for name in self.categories
+        ))
+        self._open()
+
+    # Index handling
+
+    def _source_signature(self):
+        stat = self.path.stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _load_or_build_index(self):
+        meta_file = self.index_dir / 'index.json'
+        if meta_file.exists():
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            if (meta.get('version') == INDEX_VERSION
+                    and meta.get('source') == self._source_signature()):
+                return meta
+
+        print(f"Building quote index for {self.path}...")
+        return self._build_index(meta_file)
+
+    def _iter_records(self, f, header):
+        """Yield (offset, category) for every usable line of an open source file"""
+        offset = f.tell()
+        for line in f:
+            record = self._parse_line(line, header)
+            if record is not None:
+                yield offset, record[1]
+            offset += len(line)
+
+    def _build_index(self, meta_file):
+        os.makedirs(self.index_dir, exist_ok=True)
+        signature = self._source_signature()
+
+        with open(self.path, 'rb') as f:
+            header = None
+            if self.format == 'csv':
+                header_line = f.readline()
+                header = next(csv.reader([header_line.decode('utf-8-sig')]))
+            body_start = f.tell()
+
+            # First pass: count lines per category to lay out the groups
+            counts = {}
+            for _, category in self._iter_records(f, header):
+                counts[category] = counts.get(category, 0) + 1
+
+            categories = {}
+            cursors = {}
+            start = 0
+            for slot, (category, count) in enumerate(counts.items()):
+                categories[category] = {'start': start, 'count': count, 'slot': slot}
+                cursors[category] = start
+                start += count
+
+            # Second pass: write every offset into its category's group
+            offset_path = self.index_dir / 'offsets.bin'
+            with open(offset_path, 'wb') as out:
+                out.truncate(start * OFFSET_SIZE)
+            if start:
+                with open(offset_path, 'r+b') as out:
+                    offset_map = mmap.mmap(out.fileno(), 0)
+                    try:
+                        offsets = memoryview(offset_map).cast('Q')
+                        f.seek(body_start)
+                        for offset, category in self._iter_records(f, header):
+                            offsets[cursors[category]] = offset
+                            cursors[category] += 1
+                        offsets.release()
+                        offset_map.flush()
+                    finally:
+                        offset_map.close()
+
+        # Old shuffle-bag positions do not apply to a new index
+        if self.state_file.exists():
+            self.state_file.unlink()
+
+        meta = {
+            'version': INDEX_VERSION,
+            'format': self.format,
+            'header': header,
+            'source': signature,
+            'categories': categories
+        }
+        tmp_file = meta_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_file, meta_file)
+        return meta
+
+    def _parse_line(self, line, header=None):
+        """Parse one raw source line into (quote, category), or None if unusable"""
+        text = line.decode('utf-8', errors='replace').strip()
+        if not text:
+            return None
+
+        try:
+            if self.format == 'csv':
+                row = dict(zip(header, next(csv.reader([text]))))
+            else:
+                row = json.loads(text)
+        except (ValueError, StopIteration):
+            return None
+
+        if not isinstance(row, dict):
+            return None
+        quote = (row.get('quote') or row.get('text') or '').strip()
+        category = (row.get('category') or 'uncategorized').strip().lower()
+        if not quote:
+            return None
+        return quote, category
+
+    def _open(self):
+        if not self.categories:
+            return
+        self._file = open(self.path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._offset_file = open(self.index_dir / 'offsets.bin', 'rb')
+        self._offset_map = mmap.mmap(self._offset_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = memoryview(self._offset_map).cast('Q')
+
+        # One (seed, epoch, position) record per category, updated in place
+        state_size = len(self.categories) * STATE_RECORD_SIZE
+        os.makedirs(self.state_file.parent, exist_ok=True)
+        mode = 'r+b' if self.state_file.exists() else 'w+b'
+        self._state_file = open(self.state_file, mode)
+        if os.fstat(self._state_file.fileno()).st_size != state_size:
+            self._state_file.truncate(0)
+            self._state_file.truncate(state_size)
+        self._state_map = mmap.mmap(self._state_file.fileno(), 0)
+        self._state = memoryview(self._state_map).cast('Q')
+
+    def close(self):
+        """Flush the shuffle-bag state and release the memory maps"""
+        for view in (self._offsets, self._state):
+            if view is not None:
+                view.release()
+        self._offsets = self._state = None
+        if self._state_map is not None:
+            self._state_map.flush()
+        for handle in (self._state_map, self._state_file, self._offset_map,
+                       self._offset_file, self._data, self._file):
+            if handle is not None:
+                handle.close()
+        self._state_map = self._state_file = None
+        self._offset_map = self._offset_file = None
+        self._data = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Shuffle-bag state
+
+    def _draw_index(self, category):
+        """Advance a category's shuffle-bag in the shared state map, returns the drawn index"""
+        info = self.meta['categories'][category]
+        base = info['slot'] * 3
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._state_file.fileno(), fcntl.LOCK_EX)
+            try:
+                # Another process may have drawn since, so never cache the bag
+                seed, epoch, position = self._state[base:base + 3]
+                if seed == 0:
+                    seed = random.getrandbits(64) or 1
+                    epoch = position = 0
+                bag = ShuffleBag(info['count'], seed, epoch, position)
+                index = bag.draw()
+                self._state[base:base + 3] = array('Q', (bag.seed, bag.epoch, bag.position))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._state_file.fileno(), fcntl.LOCK_UN)
+        return index
+
+    # Sampling
+
+    def __len__(self):
+        return self._cumulative_counts[-1] if self._cumulative_counts else 0
+
+    def count(self, category):
+        return self.meta['categories'].get(category, {}).get('count', 0)
+
+    def _read_record(self, category, index):
+        start = self._offsets[self.meta['categories'][category]['start'] + index]
+        end = self._data.find(b'\n', start)
+        if end == -1:
+            end = len(self._data)
+        return self._parse_line(self._data[start:end], self.meta['header'])
+
+    def draw(self, category=None, weights=None):
+        """
+        Draw a quote without replacement.
+        Args:
+            category (str, optional): Category to draw from
+            weights (dict, optional): Category -> weight mix used when no category is given
+        Returns:
+            tuple: (quote, category)
+        """
+        if not self.categories:
+            raise ValueError(f"Quote corpus is empty: {self.path}")
+
+        if category not in self.meta['categories']:
+            if weights:
+                names = [name for name in weights if name in self.meta['categories'] and weights[name] > 0]
+                if not names:
+                    raise ValueError("None of the weighted categories exist in the corpus")
+                category = random.choices(names, weights=[weights[name] for name in names])[0]
+            else:
+                category = random.choices(self.categories, cum_weights=self._cumulative_counts)[0]
+
+        return self._read_record(category, self._draw_index(category))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Build and sample a quote corpus')
+    parser.add_argument('path', help='JSONL or CSV quote file')
+    parser.add_argument('--category', help='Category to sample from')
+    parser.add_argument('-n', type=int, default=5, help='Number of quotes to draw')
+    args = parser.parse_args()
+
+    with QuoteCorpus(args.path) as corpus:
+        print(f"{len(corpus)} quotes in {len(corpus.categories)} categories")
+        for _ in range(args.n):
+            quote, category = corpus.draw(args.category)
+            print(f"({category}) {quote}")
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from collections import Counter
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError, TimedOut
+
+
+def _seconds(value):
+    """RetryAfter.retry_after is an int or a timedelta depending on the library version"""
+    return value.total_seconds() if hasattr(value, 'total_seconds') else float(value)
+
+
+class TokenBucket:
+    """Async token bucket; callers reserve a token and sleep until it is due.
+
+    Reservations may drive the balance negative, which queues callers in
+    arrival order without needing a lock.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or 1.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _reserve(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Outbox:
+    """Rate-limited, concurrent sender for Telegram bot messages.
+
+    All calls share a global bucket (Telegram allows about 30 messages per
+    second per bot) and a per-chat bucket (about 1 per second per chat).
+    The per-chat token is taken first, so a call waiting on a busy chat
+    does not hold a global token meanwhile. A RetryAfter response pauses
+    every send for the requested time before the call is retried. Other
+    network errors are retried with backoff, except BadRequest (a permanent
+    failure such as an unknown chat) and, for calls that are not safe to
+    repeat, TimedOut.
+    """
+
+    def __init__(self, rate=25.0, per_chat_rate=1.0, max_retries=3):
+        self.bucket = TokenBucket(rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}
+        self.max_retries = max_retries
+        self.paused_until = 0.0
+        self.stats = Counter()
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+        return self.chat_buckets[chat_id]
+
+    async def call(self, chat_id, method, retry_timeouts=True, **kwargs):
+        """
+        Call a bot method for one chat, returns its result or None on failure.
+        Args:
+            retry_timeouts (bool): Retry after TimedOut; pass False for sends,
+                since a timed out message may still have been delivered
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._chat_bucket(chat_id).acquire()
+            while True:
+                await self.bucket.acquire()
+                # A RetryAfter may have arrived while this call was queued
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0:
+                    break
+                await asyncio.sleep(pause)
+
+            try:
+                result = await method(chat_id=chat_id, **kwargs)
+                self.stats['sent'] += 1
+                return result
+            except RetryAfter as e:
+                # Flood control applies to the whole bot, so hold back every send
+                self.stats['retry_after'] += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + _seconds(e.retry_after))
+            except BadRequest as e:
+                # BadRequest subclasses NetworkError but retrying cannot help
+                print(f"Failed to message {chat_id}: {e}")
+                self.stats['bad_request'] += 1
+                self.stats['failed'] += 1
+                return None
+            except TimedOut as e:
+                self.stats['timed_out'] += 1
+                if not retry_timeouts:
+                    print(f"Timed out messaging {chat_id}, not resending: {e}")
+                    self.stats['failed'] += 1
+                    return None
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+            except NetworkError as e:
+                self.stats['network_errors'] += 1
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+            except TelegramError as e:
+                print(f"Failed to message {chat_id}: {e}")
+                self.stats['failed'] += 1
+                return None
+
+        print(f"Failed to message {chat_id} after {self.max_retries} retries")
+        self.stats['failed'] += 1
+        return None
+
+    async def fan_out(self, bot, chat_ids, text, reply_markup=None):
+        """Send the same message to every chat, returns [(chat_id, message_id)] for successes"""
+        messages = await asyncio.gather(*(
+            self.call(chat_id, bot.send_message, retry_timeouts=False, text=text, reply_markup=reply_markup)
+            for chat_id in chat_ids
+        ))
+        return [
+            (chat_id, message.message_id)
+            for chat_id, message in zip(chat_ids, messages)
+            if message is not None
+        ]
+
+    async def edit_all(self, bot, messages, text, reply_markup=None):
+        """Edit every (chat_id, message_id) copy of a message"""
+        await asyncio.gather(*(
+            self.call(chat_id, bot.edit_message_text, message_id=message_id,
+                      text=text, reply_markup=reply_markup)
+            for chat_id, message_id in messages
+        ))
+
+
+async def _benchmark(args):
+    from telegram import Bot
+    from .fake_services import FakeBotAPI
+
+    fake_api = FakeBotAPI(api_latency=args.latency, rate_limit=args.rate_limit).start()
+    chat_ids = list(range(1, args.admins + 1))
+    text = "🎥 New Video Ready for Review"
+    try:
+        async with Bot('123456:BENCHMARK', base_url=fake_api.url) as bot:
+            # Old behaviour: one admin after another, failures only printed
+            start = time.perf_counter()
+            delivered = 0
+            for _ in range(args.videos):
+                for chat_id in chat_ids:
+                    try:
+                        await bot.send_message(chat_id=chat_id, text=text)
+                        delivered += 1
+                    except TelegramError:
+                        pass
+            sequential = time.perf_counter() - start
+            print(f"Sequential:        {delivered}/{args.videos * args.admins} delivered "
+                  f"in {sequential:.2f}s ({delivered / sequential:.1f} msg/s)")
+
+            await asyncio.sleep(1.0)  # Let the fake rate-limit window reset
+            outbox = Outbox(rate=args.rate)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(
+                outbox.fan_out(bot, chat_ids, text) for _ in range(args.videos)
+            ))
+            concurrent = time.perf_counter() - start
+            delivered = sum(len(r) for r in results)
+            print(f"Outbox per video:  {delivered}/{args.videos * args.admins} delivered "
+                  f"in {concurrent:.2f}s ({delivered / concurrent:.1f} msg/s), {dict(outbox.stats)}")
+
+            await asyncio.sleep(1.0)
+            outbox = Outbox(rate=args.rate)
+            start = time.perf_counter()
+            delivered = len(await outbox.fan_out(bot, chat_ids, text))
+            digest = time.perf_counter() - start
+            print(f"Outbox digest:     {args.videos} videos in {delivered} messages "
+                  f"in {digest:.2f}s, {dict(outbox.stats)}")
+    finally:
+        fake_api.stop()
+    print(f"Fake API answered {fake_api.rate_limited} requests with 429")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark approval fan-out against a local fake Bot API')
+    parser.add_argument('--admins', type=int, default=50, help='Number of admin chats')
+    parser.add_argument('--videos', type=int, default=5, help='Videos announced in one burst')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per fake API call')
+    parser.add_argument('--rate-limit', type=float, default=30, help='Messages per second before the fake API returns 429')
+    parser.add_argument('--rate', type=float, default=25, help='Outbox messages per second')
+    args = parser.parse_args()
+    asyncio.run(_benchmark(args))
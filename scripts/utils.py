@@ -61,5 +61,14 @@ def ensure_ffmpeg():
         print(f"Error downloading ffmpeg: {e}")
         return False
 
+def parse_weights(text):
+    """Parse 'name=weight,name=weight' into a dict, a bare name counts as weight 1"""
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip():
+            weights[name.strip().lower()] = float(weight or 1)
+    return weights
+
 if __name__ == "__main__":
     ensure_ffmpeg()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('telegram')
+
+from scripts.approval_system import ApprovalSystem
+
+VIDEO = {'title': "Title", 'category': 'motivation', 'quote': "A quote.", 'video_path': 'video.mp4'}
+
+
+def approval_system(tmp_path, **config):
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({
+        'admin_chat_ids': [1, 2],
+        'auto_approve_after': 30,
+        'digest_window': 0,
+        'messages_per_second': 1000,
+        **config
+    }))
+    system = ApprovalSystem('123:TEST', config_file=str(config_file))
+
+    async def bot():
+        return None
+    system._bot = bot
+    return system
+
+
+def test_undelivered_digest_auto_approves_at_once(tmp_path):
+    system = approval_system(tmp_path)
+
+    async def fan_out(bot, chat_ids, text, reply_markup=None):
+        return []
+    system.outbox.fan_out = fan_out
+
+    async def request():
+        return await asyncio.wait_for(system.request_approval(dict(VIDEO)), 5)
+
+    assert asyncio.run(request()) is True
+    assert not system.pending_approvals
+    assert not system.video_digests
+
+
+def test_failed_digest_send_auto_approves_at_once(tmp_path):
+    system = approval_system(tmp_path)
+
+    async def fan_out(bot, chat_ids, text, reply_markup=None):
+        raise RuntimeError("Bot API unreachable")
+    system.outbox.fan_out = fan_out
+
+    async def request():
+        return await asyncio.wait_for(system.request_approval(dict(VIDEO)), 5)
+
+    assert asyncio.run(request()) is True
+
+
+def test_waits_for_admin_when_auto_approval_is_off(tmp_path):
+    system = approval_system(tmp_path, auto_approve_after=0)
+
+    async def fan_out(bot, chat_ids, text, reply_markup=None):
+        return [(chat_id, 1) for chat_id in chat_ids]
+    system.outbox.fan_out = fan_out
+
+    async def request():
+        task = asyncio.create_task(system.request_approval(dict(VIDEO)))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        # What handle_callback does for a reject button
+        video_id = next(iter(system.pending_approvals))
+        system.pending_approvals.pop(video_id)
+        system._resolve_decision(video_id, False)
+        return await asyncio.wait_for(task, 5)
+
+    assert asyncio.run(request()) is False
+    assert not system.decisions
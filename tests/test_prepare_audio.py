@@ -0,0 +1,59 @@
+import math
+import shutil
+import wave
+from array import array
+
+import pytest
+
+pytest.importorskip('numpy')
+if shutil.which('ffmpeg') is None:
+    pytest.skip("ffmpeg is not installed", allow_module_level=True)
+
+from scripts.prepare_audio import FRAME_SECONDS, SAMPLE_RATE, analyze_audio, prepare_audio
+
+
+def write_tone(path, lead, tone, tail, amplitude=8000):
+    """Mono 16-bit WAV: lead seconds of silence, a 220 Hz tone, tail seconds of silence"""
+    step = 2 * math.pi * 220 / SAMPLE_RATE
+    samples = array('h', bytes(2 * int(lead * SAMPLE_RATE)))
+    samples.extend(int(amplitude * math.sin(step * i)) for i in range(int(tone * SAMPLE_RATE)))
+    samples.extend(array('h', bytes(2 * int(tail * SAMPLE_RATE))))
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+
+def test_analyze_audio_finds_speech_bounds(tmp_path):
+    path = tmp_path / 'speech.wav'
+    write_tone(path, lead=0.5, tone=1.0, tail=0.7)
+
+    analysis = analyze_audio(str(path))
+    assert analysis['total_samples'] == int(2.2 * SAMPLE_RATE)
+    assert analysis['first_voiced_frame'] * FRAME_SECONDS == pytest.approx(0.5, abs=FRAME_SECONDS)
+    assert (analysis['last_voiced_frame'] + 1) * FRAME_SECONDS == pytest.approx(1.5, abs=FRAME_SECONDS)
+    assert analysis['loudness'] is not None
+
+
+def test_analyze_audio_silence_has_no_speech(tmp_path):
+    path = tmp_path / 'silence.wav'
+    write_tone(path, lead=1.0, tone=0, tail=0)
+
+    analysis = analyze_audio(str(path))
+    assert analysis['first_voiced_frame'] is None
+    assert analysis['loudness'] is None
+
+
+def test_prepare_audio_trims_to_speech_plus_padding(tmp_path):
+    source = tmp_path / 'speech.wav'
+    output = tmp_path / 'prepared.wav'
+    write_tone(source, lead=0.5, tone=1.0, tail=0.7, amplitude=2000)
+
+    stats = prepare_audio(str(source), str(output), padding=0.1)
+    assert stats['duration'] == pytest.approx(1.2, abs=2 * FRAME_SECONDS)
+    assert stats['seconds_saved'] == pytest.approx(1.0, abs=2 * FRAME_SECONDS)
+    assert stats['gain_db'] > 0  # A quiet tone is brought up towards the target
+
+    with wave.open(str(output), 'rb') as f:
+        assert f.getnframes() / f.getframerate() == pytest.approx(stats['duration'], abs=1e-3)
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+from scripts.quote_corpus import QuoteCorpus, ShuffleBag
+
+
+def write_corpus(path, quotes):
+    with open(path, 'w') as f:
+        for quote, category in quotes:
+            f.write(json.dumps({'quote': quote, 'category': category}) + '\n')
+
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / 'quotes.jsonl'
+    write_corpus(path, [(f"quote {i}", 'a' if i % 3 else 'b') for i in range(30)])
+    return path
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 64, 1000])
+def test_shuffle_bag_has_no_repeats_within_an_epoch(size):
+    bag = ShuffleBag(size, seed=12345)
+    assert sorted(bag.draw() for _ in range(size)) == list(range(size))
+    # The next epoch is a full permutation again
+    assert sorted(bag.draw() for _ in range(size)) == list(range(size))
+    assert bag.epoch == 1
+
+
+def test_shuffle_bag_resumes_from_its_state():
+    bag = ShuffleBag(50, seed=7)
+    first = [bag.draw() for _ in range(20)]
+    resumed = ShuffleBag(50, bag.seed, bag.epoch, bag.position)
+    assert sorted(first + [resumed.draw() for _ in range(30)]) == list(range(50))
+
+
+def test_draw_covers_category_without_repeats(corpus_file):
+    with QuoteCorpus(corpus_file) as corpus:
+        assert len(corpus) == 30
+        assert corpus.count('a') == 20
+        drawn = [corpus.draw('a') for _ in range(20)]
+    assert {category for _, category in drawn} == {'a'}
+    assert len({quote for quote, _ in drawn}) == 20
+
+
+def test_draw_resumes_after_reopen(corpus_file):
+    drawn = []
+    for _ in range(10):
+        with QuoteCorpus(corpus_file) as corpus:
+            drawn.append(corpus.draw('b')[0])
+    assert len(set(drawn)) == 10
+
+
+def test_instances_share_one_bag(corpus_file):
+    # Stands in for the model server and the scheduler using the same corpus
+    with QuoteCorpus(corpus_file) as first, QuoteCorpus(corpus_file) as second:
+        drawn = [(first if i % 2 else second).draw('a')[0] for i in range(20)]
+    assert len(set(drawn)) == 20
+
+
+def test_index_is_rebuilt_when_source_changes(corpus_file):
+    with QuoteCorpus(corpus_file) as corpus:
+        corpus.draw('a')
+
+    write_corpus(corpus_file, [("a brand new quote", 'c'), ("another new quote", 'c')])
+    # Make sure the signature changes even on coarse mtime filesystems
+    stat = os.stat(corpus_file)
+    os.utime(corpus_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with QuoteCorpus(corpus_file) as corpus:
+        assert corpus.categories == ('c',)
+        assert sorted(corpus.draw()[0] for _ in range(2)) == ["a brand new quote", "another new quote"]
+
+
+def test_csv_source(tmp_path):
+    path = tmp_path / 'quotes.csv'
+    path.write_text('quote,category\n"Keep going, always",Motivation\nStay curious,mindset\n')
+    with QuoteCorpus(path) as corpus:
+        assert corpus.draw('motivation') == ("Keep going, always", 'motivation')
+        assert corpus.draw(weights={'mindset': 1}) == ("Stay curious", 'mindset')
+
+
+def test_empty_corpus_raises(tmp_path):
+    path = tmp_path / 'empty.jsonl'
+    path.touch()
+    with QuoteCorpus(path) as corpus:
+        assert len(corpus) == 0
+        with pytest.raises(ValueError):
+            corpus.draw()
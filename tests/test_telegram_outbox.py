@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('telegram')
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from scripts.telegram_outbox import Outbox, TokenBucket
+
+
+class FlakySender:
+    """Bot method stand-in that raises the queued errors before succeeding"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    async def __call__(self, chat_id, **kwargs):
+        self.calls.append((chat_id, time.monotonic()))
+        if self.errors:
+            raise self.errors.pop(0)
+        return chat_id
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_token_bucket_spaces_calls_at_its_rate():
+    async def acquire_all():
+        bucket = TokenBucket(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # One token is available at once, the other five take 1/50 s each
+    assert run(acquire_all()) == pytest.approx(0.1, abs=0.05)
+
+
+def test_retry_after_pauses_every_send():
+    async def send_all():
+        outbox = Outbox(rate=1000, per_chat_rate=1000)
+        sender = FlakySender(RetryAfter(0.3))
+        start = time.monotonic()
+        results = await asyncio.gather(*(outbox.call(chat_id, sender) for chat_id in range(5)))
+        delivered = [t - start for _, t in sender.calls[1:]]
+        return outbox, results, delivered
+
+    outbox, results, delivered = run(send_all())
+    assert results == list(range(5))
+    assert min(delivered) >= 0.3
+    assert outbox.stats['retry_after'] == 1
+    assert outbox.stats['sent'] == 5
+
+
+def test_bad_request_is_not_retried():
+    async def send():
+        outbox = Outbox(rate=1000, per_chat_rate=1000)
+        sender = FlakySender(BadRequest("Chat not found"))
+        return outbox, sender, await outbox.call(1, sender)
+
+    outbox, sender, result = run(send())
+    assert result is None
+    assert len(sender.calls) == 1
+    assert outbox.stats['bad_request'] == 1
+    assert outbox.stats['failed'] == 1
+
+
+def test_timed_out_send_is_not_repeated():
+    async def send():
+        outbox = Outbox(rate=1000, per_chat_rate=1000)
+        sender = FlakySender(TimedOut())
+        return sender, await outbox.call(1, sender, retry_timeouts=False)
+
+    sender, result = run(send())
+    assert result is None
+    assert len(sender.calls) == 1
+
+
+def test_network_errors_are_retried():
+    async def send():
+        outbox = Outbox(rate=1000, per_chat_rate=1000)
+        sender = FlakySender(NetworkError("Connection reset"), TimedOut())
+        return outbox, await outbox.call(1, sender)
+
+    outbox, result = run(send())
+    assert result == 1
+    assert outbox.stats['network_errors'] == 1
+    assert outbox.stats['timed_out'] == 1
+
+
+def test_fan_out_reports_only_delivered_copies():
+    class Message:
+        def __init__(self, message_id):
+            self.message_id = message_id
+
+    class Bot:
+        async def send_message(self, chat_id, text, reply_markup=None):
+            if chat_id == 2:
+                raise BadRequest("Chat not found")
+            return Message(chat_id * 10)
+
+    async def send():
+        return await Outbox(rate=1000, per_chat_rate=1000).fan_out(Bot(), [1, 2, 3], "hello")
+
+    assert run(send()) == [(1, 10), (3, 30)]